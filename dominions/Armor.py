@@ -22,11 +22,6 @@
 __docformat__ = "reStructuredText"
 
 
-from collections import (
-    OrderedDict             as _OrderedDict,
-)
-
-
 from sqlalchemy import (
     Column                      as _SQLA_Column,
     ForeignKey                  as _SQLA_ForeignKey,
@@ -42,10 +37,7 @@ from sqlalchemy.orm import (
 
 
 from dominions.utils import (
-    from_native_uint16      as _from_native_uint16,
-    from_native_int16       as _from_native_int16,
-    from_native_uint32      as _from_native_uint32,
-    from_string             as _from_string,
+    RecordLayout            as _RecordLayout,
     PLATFORM_LINUX          as _PLATFORM_LINUX,
     PLATFORM_MACOSX         as _PLATFORM_MACOSX,
     PLATFORM_WINDOWS        as _PLATFORM_WINDOWS,
@@ -115,9 +107,22 @@ class Armor( _DataTableRow_NamedInteger, _DataTableRow_ProgramImage ):
     __tablename__               = "armors"
 
 
-    _TITLE                      = "Armor"
-    _PROGRAM_IMAGE_RECORD_SIZES = {
-        "4.03": 96, "4.04": 96,
+    _TITLE                          = "Armor"
+    _PROGRAM_IMAGE_RECORD_LAYOUT_4_03   = _RecordLayout( [
+        ( "name",                       "36s" ),
+        ( "protections",                "12H" ),
+        ( None,                         "H" ),
+        ( "defense",                    "h" ),
+        ( "encumbrance",                "H" ),
+        ( "armor_type",                 "H" ),
+        ( "resource_cost",              "H" ),
+        ( None,                         "H" ),
+        ( "attribute_keys",             "3I" ),
+        ( "attribute_values",           "3I" ),
+    ] )
+    _PROGRAM_IMAGE_RECORD_LAYOUTS   = {
+        "4.03": _PROGRAM_IMAGE_RECORD_LAYOUT_4_03,
+        "4.04": _PROGRAM_IMAGE_RECORD_LAYOUT_4_03,
     }
 
 
@@ -138,29 +143,17 @@ class Armor( _DataTableRow_NamedInteger, _DataTableRow_ProgramImage ):
 
 
     @classmethod
-    def from_program_image(
-        cls, program_image, base_offset, number, dominions_version
+    def from_program_image_fields(
+        cls, fields, unknowns, base_offset, number, dominions_version
     ):
-        """ Creates an instance from a program image. """
-
-        # TODO: Version this constant.
-        NAME_LENGTH     = 36
-
-        offset = base_offset
-        
-        unknowns = _OrderedDict( )
-        
-        name, __ = _from_string( program_image, offset, NAME_LENGTH )
-        if "end" == name: raise StopIteration( )
-        offset += NAME_LENGTH
+        """ Creates an instance from the decoded fields of a record. """
 
+        # Protections are stored as pairs of zone and amount.
         protections = [ ]
-        for i in range( 6 ):
-            protection_zone, offset \
-            = _from_native_uint16( program_image, offset )
-            protection_amount, offset = _from_native_uint16(
-                program_image, offset
-            )
+        raw_protections = fields[ "protections" ]
+        for protection_zone, protection_amount in zip(
+            raw_protections[ 0 : : 2 ], raw_protections[ 1 : : 2 ]
+        ):
             if protection_zone:
                 protections.append( ArmorProtection(
                     armor_number = number,
@@ -168,34 +161,10 @@ class Armor( _DataTableRow_NamedInteger, _DataTableRow_ProgramImage ):
                     protection = protection_amount
                 ) )
 
-        unknowns[ offset ], offset \
-        = _from_native_uint16( program_image, offset )
-        
-        defense, offset = _from_native_int16( program_image, offset )
-
-        encumbrance, offset = _from_native_uint16( program_image, offset )
-
-        armor_type, offset = _from_native_uint16( program_image, offset )
-
-        resource_cost, offset = _from_native_uint16( program_image, offset )
-
-        unknowns[ offset ], offset \
-        = _from_native_uint16( program_image, offset )
-
-        attribute_keys = [ ]
-        for i in range( 3 ):
-            attribute_key, offset \
-            = _from_native_uint32( program_image, offset )
-            attribute_keys.append( attribute_key )
-
-        attribute_values = [ ]
-        for i in range( 3 ):
-            attribute_value, offset \
-            = _from_native_uint32( program_image, offset )
-            attribute_values.append( attribute_value )
-
         attributes = [ ]
-        for key, value in zip( attribute_keys, attribute_values ):
+        for key, value in zip(
+            fields[ "attribute_keys" ], fields[ "attribute_values" ]
+        ):
             if not key: continue
             attributes.append( _ArmorAttribute.from_raw_data(
                 armor_number = number,
@@ -203,25 +172,36 @@ class Armor( _DataTableRow_NamedInteger, _DataTableRow_ProgramImage ):
                 raw_value = value
             ) )
 
+        # Note: Unknown fields are keyed by offset within the program image.
         unknown_fields = [
             ArmorUnknownField(
                 armor_number = number,
-                offset = offset, value = value
+                offset = base_offset + offset, value = value
             )
             for offset, value in unknowns.items( ) if value
         ]
 
         return cls(
-            number = number, name = name,
-            armor_type = armor_type,
-            protections = protections, defense = defense,
-            encumbrance = encumbrance,
-            resource_cost = resource_cost,
+            number = number, name = fields[ "name" ],
+            armor_type = fields[ "armor_type" ],
+            protections = protections, defense = fields[ "defense" ],
+            encumbrance = fields[ "encumbrance" ],
+            resource_cost = fields[ "resource_cost" ],
             attributes = attributes,
             unknown_fields = unknown_fields
         )
 
 
+    def rebase_program_image_offsets( self, offset_delta ):
+        """ Shifts the offsets of the unknown fields within the program image.
+            Returns whether any offset was shifted. """
+
+        for unknown_field in self.unknown_fields:
+            unknown_field.offset += offset_delta
+
+        return bool( self.unknown_fields )
+
+
     def pformat_row( self,
         tables, pformat_config = _PrettyFormatConfig( )
     ):
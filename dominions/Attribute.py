@@ -28,6 +28,7 @@ from collections import (
 )
 
 from sqlalchemy import (
+    and_                        as _SQLA_and,
     Table                       as _SQLA_Table,
     Column                      as _SQLA_Column,
     ForeignKey                  as _SQLA_ForeignKey,
@@ -38,6 +39,7 @@ from sqlalchemy.ext.declarative import (
     declared_attr               as _SQLA_declared_attr,
 )
 from sqlalchemy.orm import (
+    foreign                     as _SQLA_foreign,
     relationship                as _SQLA_relationship,
 )
 from sqlalchemy.orm.util import (
@@ -673,7 +675,17 @@ class Attribute( _DataTableRow ):
     @classmethod
     def __declare_last__( cls ):
         # Perform late binding against abstract concrete bases.
-        cls.value = _SQLA_relationship( AttributeValue, uselist = False )
+        # Note: Values of several attributes share database tables,
+        #       so the union holds their rows once per attribute number.
+        cls.value = _SQLA_relationship(
+            AttributeValue, uselist = False,
+            primaryjoin = lambda: _SQLA_and(
+                cls.record_id
+                == _SQLA_foreign( AttributeValue.attribute_record_id ),
+                cls.attribute_number
+                == AttributeValue.attribute_number_VIRTUAL
+            )
+        )
 
 
     @classmethod
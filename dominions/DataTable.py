@@ -22,12 +22,29 @@
 __docformat__ = "reStructuredText"
 
 
+from abc import (
+    abstractmethod          as _abstractmethod,
+)
 from collections import (
     namedtuple              as _namedtuple,
     OrderedDict             as _OrderedDict,
 )
+from collections.abc import (
+    Mapping                 as _Mapping,
+)
 
 import csv              as _csv
+import hashlib          as _hashlib
+import json             as _json
+from array import (
+    array                   as _array,
+)
+from itertools import (
+    repeat                  as _repeat,
+)
+from os.path import (
+    extsep                  as _path_extsep,
+)
 
 from sqlalchemy.ext.declarative import (
     declarative_base        as _SQLA_declarative_base,
@@ -37,6 +54,7 @@ from sqlalchemy import (
     ForeignKey              as _SQLA_ForeignKey,
     Integer                 as _SQLA_Integer,
     String                  as _SQLA_String,
+    inspect                 as _SQLA_inspect,
 )
 from sqlalchemy.ext.declarative import (
     declared_attr           as _SQLA_declared_attr,
@@ -50,6 +68,13 @@ from dominions.utils import (
     database_session_scope  as _database_session_scope,
     DominionsVersion        as _DominionsVersion,
     PrettyFormatConfig      as _PrettyFormatConfig,
+    intern_string           as _intern_string,
+    npy_header              as _npy_header,
+)
+from dominions.ProgramImage import (
+    program_image_digest    as _program_image_digest,
+    ElfImage                as _ElfImage,
+    ProgramImageSurvey      as _ProgramImageSurvey,
 )
 
 
@@ -294,7 +319,36 @@ class DataTable( object ):
 
 
 class DataTable_CSV( DataTable ):
-    """ A generic table which can be loaded from CSV data. """
+    """ A generic table which can be loaded from CSV data.
+
+        Each table declares the columns of its CSV data as pairs of name
+        and type, along with the dialect of the data. Declared columns
+        without a type, such as comments, are read but not loaded.
+        The column with the Dominions versions, with which rows are tagged,
+        is optional. The header of the data is validated before any rows
+        are read. Values are then converted column by column, so that
+        rows are created from values of the declared types. Malformed
+        data are reported with the name of the file and the line. """
+
+
+    _CSV_DIALECT            = "excel"
+    _CSV_COLUMNS            = None
+    _CSV_VERSION_COLUMN     = "dominions_version"
+
+
+    @classmethod
+    def CSV_DIALECT( cls ):
+        """ Returns the dialect of the CSV data. """
+
+        return cls._CSV_DIALECT
+
+
+    @classmethod
+    def CSV_COLUMNS( cls ):
+        """ Returns the declared columns of the CSV data,
+            as pairs of name and type. """
+
+        return cls._CSV_COLUMNS
 
 
     @classmethod
@@ -311,93 +365,1005 @@ class DataTable_CSV( DataTable ):
     def from_csv( cls, istream, dominions_version ):
         """ Creates an instance from a stream of CSV rows. """
 
-        sniffer = _csv.Sniffer( )
-        if not sniffer.has_header( istream.read( 1024 ) ):
-            raise IOError( "Invalid CSV input stream." )
-        istream.seek( 0 )
-        dialect = sniffer.sniff( istream.read( 1024 ) )
-        istream.seek( 0 )
+        return cls.from_versioned_rows(
+            cls.versioned_rows_from_csv( istream ), dominions_version
+        )
+
+
+    @classmethod
+    def from_versioned_rows( cls, versioned_rows, dominions_version ):
+        """ Creates an instance from versioned rows, as read from CSV,
+            keeping the latest version of each row, which is not greater
+            than the targeted version. Untagged rows are always kept. """
 
         table = _OrderedDict( )
         platform = dominions_version.platform
 
-        csv = _csv.DictReader( istream, dialect = dialect )
-        for row in csv:
+        for row_version, key, row in versioned_rows:
 
             # Exclude rows which are tagged for a version of Dominions
             # greater than the targeted version.
-            if "dominions_version" in row:
-                row_dominions_version \
-                = _DominionsVersion( platform, row[ "dominions_version" ] )
-                if row_dominions_version > dominions_version: continue
+            if None is not row_version and _DominionsVersion(
+                platform, row_version
+            ) > dominions_version: continue
 
             # Add new table entry or update table entry from CSV row.
             # Note: Newer versions of a row are expected to be encountered
             #       later than earlier versions of it.
-            table[ cls._ROW_CLASS.key_from_dict( row ) ] \
-            = cls._ROW_CLASS.from_dict( row )
+            table[ key ] = row
 
         return cls( table )
 
 
+    @classmethod
+    def versioned_rows_from_csv( cls, istream ):
+        """ Reads every version of every row from a stream of CSV rows.
+            Returns a list of triples of the version, with which a row is
+            tagged, or None, the key of the row, and the row itself,
+            in the order of the stream.
+            Raises ValueError on malformed data. """
+
+        file_name = getattr( istream, "name", "<stream>" )
+        csv = _csv.reader( istream, dialect = cls._CSV_DIALECT )
+
+        try:
+            header = next( csv, None )
+            if None is header:
+                raise ValueError( "{0}: Missing CSV header.".format(
+                    file_name
+                ) )
+            columns, version_index = cls._csv_columns_from_header(
+                header, file_name, csv.line_num
+            )
+
+            records = [ ]
+            line_numbers = [ ]
+            for record in csv:
+                if not record: continue
+                if len( header ) != len( record ):
+                    raise ValueError(
+                        "{0}:{1}: Expected {2} fields, found {3}.".format(
+                            file_name, csv.line_num,
+                            len( header ), len( record )
+                        )
+                    )
+                records.append( record )
+                line_numbers.append( csv.line_num )
+        except _csv.Error as exc:
+            raise ValueError( "{0}:{1}: {2}".format(
+                file_name, csv.line_num, exc
+            ) )
+
+        fields = list( zip( *records ) ) or [ ( ) ] * len( header )
+        names = [ ]
+        values = [ ]
+        for index, name, type_ in columns:
+            names.append( name )
+            values.append( cls._csv_values_from_field(
+                fields[ index ], type_, name, file_name, line_numbers
+            ) )
+
+        if None is version_index: versions = [ None ] * len( records )
+        else:
+            versions = [
+                _intern_string( version ) or None
+                for version in fields[ version_index ]
+            ]
+            cls._validate_csv_versions( versions, file_name, line_numbers )
+
+        row_class = cls._ROW_CLASS
+        key_index = names.index( row_class.KEY_NAME( ) )
+
+        return [
+            (
+                row_version, row_values[ key_index ],
+                row_class( **dict( zip( names, row_values ) ) )
+            )
+            for row_version, row_values in zip( versions, zip( *values ) )
+        ]
+
+
+    @classmethod
+    def _csv_columns_from_header( cls, header, file_name, line_number ):
+        """ Validates the header of CSV data against the declared columns.
+            Returns a list of triples of the index, name, and type
+            of each column, which is loaded, and the index of the column
+            of versions, or None, if there is none. """
+
+        declared_types = _OrderedDict( cls._CSV_COLUMNS )
+        if cls._ROW_CLASS.KEY_NAME( ) not in declared_types:
+            raise LookupError( "Key column {0!r} is not declared.".format(
+                cls._ROW_CLASS.KEY_NAME( )
+            ) )
+
+        def error( message, name ):
+            return ValueError( "{0}:{1}: {2} column {3!r}.".format(
+                file_name, line_number, message, name
+            ) )
+
+        indices = { }
+        for index, name in enumerate( header ):
+            if name in indices: raise error( "Duplicate", name )
+            if      name not in declared_types \
+                and cls._CSV_VERSION_COLUMN != name:
+                raise error( "Undeclared", name )
+            indices[ name ] = index
+        for name in declared_types:
+            if name not in indices: raise error( "Missing", name )
+
+        return [
+            ( indices[ name ], name, type_ )
+            for name, type_ in declared_types.items( )
+            if None is not type_
+        ], indices.get( cls._CSV_VERSION_COLUMN )
+
+
+    @staticmethod
+    def _csv_values_from_field(
+        field, type_, name, file_name, line_numbers
+    ):
+        """ Converts all values of a field of CSV data to a type at once.
+            Strings are interned, since they recur across tables. """
+
+        if str is type_: return list( map( _intern_string, field ) )
+
+        try: return list( map( type_, field ) )
+        except ValueError: pass
+
+        # Note: Only malformed data pay for locating the malformed value.
+        for value, line_number in zip( field, line_numbers ):
+            try: type_( value )
+            except ValueError:
+                raise ValueError(
+                    "{0}:{1}: Invalid {2} value {3!r} in column {4!r}."
+                    .format(
+                        file_name, line_number, type_.__name__, value, name
+                    )
+                )
+
+
+    @staticmethod
+    def _validate_csv_versions( versions, file_name, line_numbers ):
+        """ Validates the distinct Dominions versions,
+            with which rows of CSV data are tagged. """
+
+        first_line_numbers = { }
+        for version, line_number in zip( versions, line_numbers ):
+            if None is not version:
+                first_line_numbers.setdefault( version, line_number )
+
+        for version, line_number in first_line_numbers.items( ):
+            try: _DominionsVersion.key_from_version( version )
+            except ValueError:
+                raise ValueError(
+                    "{0}:{1}: Invalid Dominions version {2!r}.".format(
+                        file_name, line_number, version
+                    )
+                )
+
+
 class DataTableRow_ProgramImage( object ):
     """ A mixin to provide support for common activities
         pertaining to table rows and program images in memory. """
 
 
-    _PROGRAM_IMAGE_RECORD_SIZES = None
+    _PROGRAM_IMAGE_RECORD_LAYOUTS   = None
+
+
+    @classmethod
+    def PROGRAM_IMAGE_RECORD_LAYOUT( cls, dominions_version ):
+        """ Returns the layout of a record within the program image. """
+
+        return cls._PROGRAM_IMAGE_RECORD_LAYOUTS[ dominions_version.version ]
 
 
     @classmethod
     def PROGRAM_IMAGE_RECORD_SIZE( cls, dominions_version ):
         """ Returns the size of a record within the program image. """
 
-        return cls._PROGRAM_IMAGE_RECORD_SIZES[ dominions_version.version ]
+        return cls.PROGRAM_IMAGE_RECORD_LAYOUT( dominions_version ).size
+
+
+    @classmethod
+    def from_program_image(
+        cls, program_image, base_offset, number, dominions_version
+    ):
+        """ Creates an instance from a program image. """
+
+        fields, unknowns = cls.fields_from_program_image(
+            program_image, base_offset, dominions_version
+        )
+
+        return cls.from_program_image_fields(
+            fields, unknowns, base_offset, number, dominions_version
+        )
+
+
+    @classmethod
+    def fields_from_program_image(
+        cls, program_image, base_offset, dominions_version
+    ):
+        """ Unpacks and decodes the fields of a record in a program image.
+            Returns a dictionary of decoded fields and an ordered dictionary
+            of unknown fields, keyed by offset within the record. """
+
+        fields, unknowns \
+        = cls.PROGRAM_IMAGE_RECORD_LAYOUT( dominions_version ).unpack_from(
+            program_image, base_offset
+        )
+
+        return cls.decode_program_image_fields( fields ), unknowns
+
+
+    @classmethod
+    def decode_program_image_fields( cls, fields ):
+        """ Decodes derived fields from the raw fields of a record.
+            (Empty implementation - override as needed.) """
+
+        return fields
+
+
+    @classmethod
+    def decode_program_image_columns( cls, columns ):
+        """ Decodes derived columns from the raw columns
+            of a structured array of records.
+            (Empty implementation - override as needed.) """
+
+        return columns
+
+
+    @classmethod
+    def from_program_image_fields(
+        cls, fields, unknowns, base_offset, number, dominions_version
+    ):
+        """ Creates an instance from the decoded fields of a record.
+            (Dummy implementation - override.) """
+
+        return cls( **{ cls.KEY_NAME( ): number } )
+
+
+    def rebase_program_image_offsets( self, offset_delta ):
+        """ Shifts the offsets within the program image, which the row
+            records, such as when its record moved between versions
+            of the program. Returns whether any offset was shifted.
+            (Empty implementation - override as needed.) """
+
+        return False
+
+
+    def prepare_for_persistence( self ):
+        """ Completes the row with data, which are only needed in a database,
+            such as related rows that are otherwise held compactly.
+            (Empty implementation - override as needed.) """
+
+        pass
+
+
+class TablesLookupsRecorder( _Mapping ):
+    """ A view of tables by label, which records the labels of the tables,
+        which are looked up through it. """
+
+
+    def __init__( self, tables ):
+
+        self._tables    = tables
+        self._labels    = set( )
+
+
+    @property
+    def labels( self ):
+        """ Labels of the tables, which were looked up. """
+
+        return frozenset( self._labels )
+
+
+    def __getitem__( self, label ):
+
+        table = self._tables[ label ]
+        self._labels.add( label )
+
+        return table
+
+
+    def __iter__( self ):
+
+        return iter( self._tables )
+
+
+    def __len__( self ):
+
+        return len( self._tables )
+
+
+class CachedRows( _Mapping ):
+    """ Rows of a table, keyed by record number, which are only materialized,
+        when accessed. Materialized rows are held in a bounded cache
+        of the most recently accessed rows.
+
+        This class is abstract: subclasses provide the materialization
+        of rows. """
+
+
+    def __init__( self, records_count, cache_size ):
+
+        self._records_count        = records_count
+        self._cache_size           = cache_size
+        self._cache                = _OrderedDict( )
+
+
+    def __getitem__( self, number ):
+
+        row = self._cache.pop( number, None )
+        if None is row:
+            if number not in self: raise KeyError( number )
+            row = self._materialize_row( number )
+        self._cache[ number ] = row
+        while self._cache_size < len( self._cache ):
+            self._cache.popitem( last = False )
+
+        return row
+
+
+    def __contains__( self, number ):
+
+        return number in range( self._records_count )
+
+
+    def __iter__( self ):
+
+        return iter( range( self._records_count ) )
+
+
+    def __len__( self ):
+
+        return self._records_count
+
+
+    def __getstate__( self ):
+
+        state = self.__dict__.copy( )
+        state[ "_cache" ] = _OrderedDict( )
+        return state
+
+
+    @_abstractmethod
+    def _materialize_row( self, number ):
+        """ Materializes the row with the given record number.
+            (Abstract - provided by subclasses.) """
+
+
+class ProgramImageRows( CachedRows ):
+    """ Rows of a table within a program image, which are only decoded,
+        when accessed.
+
+        The program image must stay open as long as the rows are in use. """
+
+
+    def __init__( self,
+        row_class, program_image, base_offset, records_count,
+        dominions_version, cache_size
+    ):
+
+        super( ProgramImageRows, self ).__init__( records_count, cache_size )
+        self._row_class            = row_class
+        self._program_image        = program_image
+        self._base_offset          = base_offset
+        self._dominions_version    = dominions_version
+        self._record_size          \
+        = row_class.PROGRAM_IMAGE_RECORD_SIZE( dominions_version )
+
+
+    def _materialize_row( self, number ):
+        """ Decodes the row with the given record number. """
+
+        return self._row_class.from_program_image(
+            self._program_image,
+            self._base_offset + number * self._record_size,
+            number, self._dominions_version
+        )
+
+
+class ColumnarRows( CachedRows ):
+    """ Rows of a table within a program image, which are stored as columns
+        of decoded fields, rather than as objects.
+
+        Integer fields are stored as typed arrays; other fields are stored
+        as lists. Fields with several values per record, such as attributes
+        or troop slots, and unknown fields are stored as child columns,
+        which are indexed by arrays of offsets. Row objects are only
+        materialized, when accessed. """
+
+
+    def __init__( self,
+        row_class, base_offset, dominions_version, cache_size
+    ):
+
+        super( ColumnarRows, self ).__init__( 0, cache_size )
+        self._row_class            = row_class
+        self._base_offset          = base_offset
+        self._dominions_version    = dominions_version
+        self._record_size          \
+        = row_class.PROGRAM_IMAGE_RECORD_SIZE( dominions_version )
+        self._columns              = _OrderedDict( )
+        self._child_offsets        = { }
+        self._unknown_keys         = [ ]
+        self._unknown_values       = [ ]
+        self._unknown_offsets      = [ 0 ]
+
+
+    def append( self, fields, unknowns ):
+        """ Appends the decoded fields of the next record. """
+
+        columns         = self._columns
+        child_offsets   = self._child_offsets
+        if not self._records_count:
+            for name, value in fields.items( ):
+                columns[ name ] = [ ]
+                if isinstance( value, ( tuple, list ) ):
+                    child_offsets[ name ] = [ 0 ]
+
+        for name, value in fields.items( ):
+            if name in child_offsets:
+                columns[ name ].extend( value )
+                child_offsets[ name ].append( len( columns[ name ] ) )
+            else: columns[ name ].append( value )
+        self._unknown_keys.extend( unknowns.keys( ) )
+        self._unknown_values.extend( unknowns.values( ) )
+        self._unknown_offsets.append( len( self._unknown_keys ) )
+
+        self._records_count += 1
+
+
+    def compact( self ):
+        """ Converts columns, which only hold integers, into typed arrays. """
+
+        for name, column in self._columns.items( ):
+            self._columns[ name ] = self._compact_column( column )
+        for name, offsets in self._child_offsets.items( ):
+            self._child_offsets[ name ] = _array( "q", offsets )
+        self._unknown_keys      = self._compact_column( self._unknown_keys )
+        self._unknown_values    = self._compact_column( self._unknown_values )
+        self._unknown_offsets   = _array( "q", self._unknown_offsets )
+
+
+    @staticmethod
+    def _compact_column( column ):
+        """ Returns a typed array for a column of integers,
+            else the column itself. """
+
+        if all( int is type( value ) for value in column ):
+            try: return _array( "q", column )
+            except OverflowError: pass
+
+        return column
+
+
+    def _materialize_row( self, number ):
+        """ Creates the row object for the given record number
+            from the columns. """
+
+        fields = { }
+        for name, column in self._columns.items( ):
+            offsets = self._child_offsets.get( name )
+            if None is offsets: fields[ name ] = column[ number ]
+            else:
+                fields[ name ] = tuple(
+                    column[ offsets[ number ] : offsets[ number + 1 ] ]
+                )
+        start, stop = self._unknown_offsets[ number : number + 2 ]
+        unknowns = _OrderedDict( zip(
+            self._unknown_keys[ start : stop ],
+            self._unknown_values[ start : stop ]
+        ) )
+
+        return self._row_class.from_program_image_fields(
+            fields, unknowns,
+            self._base_offset + number * self._record_size,
+            number, self._dominions_version
+        )
 
 
 class DataTable_ProgramImage( DataTable ):
     """ A generic table which can be loaded from a program image. """
 
 
+    _PROGRAM_IMAGE_BASE_OFFSETS         = { }
+    _PROGRAM_IMAGE_END_OF_TABLE_NAME    = b"end\0"
+    _PROGRAM_IMAGE_CHUNK_SIZE           = 256
+    _PROGRAM_IMAGE_FINGERPRINT_SIZE     = 16
+    _LAZY_ROWS_CACHE_SIZE               = 256
+    _RAW_RECORDS_FORMAT_VERSION         = 1
+
+
+    _dominions_version          = None
+    _base_offset                = None
+    _fingerprints               = None
+    _changed_record_numbers     = None
+    _removed_record_numbers     = frozenset( )
+    _pformatted_rows            = None
+    _pformatted_rows_config     = None
+    _pformatted_rows_labels     = frozenset( )
+    _lookups                    = None
+
+
     @classmethod
-    def from_program_image( cls, program_image, dominions_version ):
-        """ Creates an instance from a program image in memory. """
+    def from_program_image(
+        cls, program_image, dominions_version, bulk = False, progress = None,
+        previous = None
+    ):
+        """ Creates an instance from a program image in memory.
+            In bulk mode, all records are viewed as one structured array
+            and derived fields are decoded across all of them at once.
+            If a progress callback is supplied, then it is called
+            with the table label, the number of records extracted so far,
+            and the total number of records in the table.
+            If a previously extracted table is supplied, then only the
+            records, whose fingerprints differ from those of the previous
+            table, are decoded anew. The rows of the other records and their
+            formatted forms are taken over from the previous table.
+            If the table moved within the program image, then the offsets,
+            which the taken rows record, are shifted along with it. """
+
+        base_offset, records_count = cls.locate_in_program_image(
+            program_image, dominions_version
+        )
+        fingerprints = cls.fingerprints_from_program_image(
+            program_image, base_offset, records_count, dominions_version
+        )
 
-        base_offset = cls._find_table_base_offset(
+        if None is previous or not previous.is_comparable( dominions_version ):
+            rows = cls.rows_from_program_image(
+                program_image, dominions_version,
+                records_range = ( 0, records_count ),
+                base_offset = base_offset, bulk = bulk, progress = progress
+            )
+            return cls.from_extracted_rows(
+                rows, program_image, dominions_version,
+                base_offset = base_offset, fingerprints = fingerprints
+            )
+
+        rows, changed_record_numbers = cls._rows_from_program_image_changes(
+            program_image, base_offset, dominions_version, fingerprints,
+            previous, progress = progress
+        )
+        self = cls.from_extracted_rows(
+            rows, program_image, dominions_version,
+            base_offset = base_offset, fingerprints = fingerprints
+        )
+        self._changed_record_numbers = changed_record_numbers
+        self._removed_record_numbers = frozenset(
+            range( records_count, len( previous._fingerprints ) )
+        )
+        self._take_pformatted_rows( previous )
+
+        return self
+
+
+    @classmethod
+    def from_program_image_lazily(
+        cls, program_image, dominions_version, cache_size = None
+    ):
+        """ Creates an instance from a program image in memory, which decodes
+            rows only when they are accessed. The program image must stay
+            open as long as the instance is in use. Extracted tables are not
+            post-processed. """
+
+        base_offset, records_count = cls.locate_in_program_image(
             program_image, dominions_version
         )
 
-        self = cls._from_program_image(
-            program_image, base_offset, dominions_version
+        return cls( ProgramImageRows(
+            cls._ROW_CLASS, program_image, base_offset, records_count,
+            dominions_version,
+            cls._LAZY_ROWS_CACHE_SIZE if None is cache_size else cache_size
+        ) )
+
+
+    @classmethod
+    def from_program_image_columnar(
+        cls, program_image, dominions_version, bulk = False,
+        cache_size = None
+    ):
+        """ Creates an instance from a program image in memory, which stores
+            the decoded fields of its rows as columns and materializes
+            row objects only when they are accessed. Extracted tables are
+            not post-processed, since changes to materialized rows would be
+            lost, when the rows are evicted from their cache. """
+
+        row_class = cls._ROW_CLASS
+        RECORD_SIZE = row_class.PROGRAM_IMAGE_RECORD_SIZE( dominions_version )
+        base_offset, records_count = cls.locate_in_program_image(
+            program_image, dominions_version
         )
 
+        rows = ColumnarRows(
+            row_class, base_offset, dominions_version,
+            cls._LAZY_ROWS_CACHE_SIZE if None is cache_size else cache_size
+        )
+        if bulk:
+            for __, fields, unknowns in cls._fields_from_program_image_bulk(
+                program_image, base_offset, dominions_version,
+                ( 0, records_count )
+            ): rows.append( fields, unknowns )
+        else:
+            for number in range( records_count ):
+                rows.append( *row_class.fields_from_program_image(
+                    program_image, base_offset + number * RECORD_SIZE,
+                    dominions_version
+                ) )
+        rows.compact( )
+
+        return cls( rows )
+
+
+    @classmethod
+    def from_extracted_rows(
+        cls, rows, program_image, dominions_version,
+        base_offset = None, fingerprints = None
+    ):
+        """ Creates an instance from rows extracted from a program image,
+            possibly piecewise and by several processes.
+            The base offset of the table and the fingerprints of its records
+            are found, unless they are supplied. """
+
+        if None is base_offset:
+            base_offset = cls._find_table_base_offset(
+                program_image, dominions_version
+            )
+        if None is fingerprints:
+            fingerprints = cls.fingerprints_from_program_image(
+                program_image, base_offset, len( rows ), dominions_version
+            )
+
+        self = cls( rows )
+        self._dominions_version = dominions_version
+        self._base_offset       = base_offset
+        self._fingerprints      = fingerprints
+
         self.postprocess_extracted_table( program_image, dominions_version )
 
         return self
 
 
-    # TODO: Implement sniffer rather than rely on hard-coded constants.
     @classmethod
-    def _find_table_base_offset( cls,
+    def fingerprints_from_program_image(
+        cls, program_image, base_offset, records_count, dominions_version
+    ):
+        """ Returns a list of digests of the raw bytes of each record
+            of the table, in order of record number. """
+
+        RECORD_SIZE \
+        = cls._ROW_CLASS.PROGRAM_IMAGE_RECORD_SIZE( dominions_version )
+        DIGEST_SIZE = cls._PROGRAM_IMAGE_FINGERPRINT_SIZE
+        blake2b     = _hashlib.blake2b
+
+        return [
+            blake2b(
+                program_image[ offset : offset + RECORD_SIZE ],
+                digest_size = DIGEST_SIZE
+            ).digest( )
+            for offset in range(
+                base_offset, base_offset + records_count * RECORD_SIZE,
+                RECORD_SIZE
+            )
+        ]
+
+
+    @classmethod
+    def _rows_from_program_image_changes( cls,
+        program_image, base_offset, dominions_version, fingerprints,
+        previous, progress = None
+    ):
+        """ Extracts the rows of a table from a program image, decoding only
+            the records whose fingerprints differ from those of the same
+            records in a previous table. The rows of the other records are
+            taken over and shifted by the distance, which the table moved.
+            Returns the rows and the set of the numbers of the records,
+            which were decoded or whose rows were shifted. """
+
+        RECORD_SIZE \
+        = cls._ROW_CLASS.PROGRAM_IMAGE_RECORD_SIZE( dominions_version )
+        previous_fingerprints   = previous._fingerprints
+        previous_rows           = previous._table
+        offset_delta            = base_offset - previous._base_offset
+
+        changed_record_numbers = frozenset(
+            number for number, fingerprint in enumerate( fingerprints )
+            if  number >= len( previous_fingerprints )
+            or  fingerprint != previous_fingerprints[ number ]
+        )
+
+        # Note: Changes are expected to be few, so the changed records
+        #       are decoded one by one, even in bulk mode.
+        rows = _OrderedDict( )
+        rebased_record_numbers = set( )
+        records_done = 0
+        for number in range( len( fingerprints ) ):
+            if number not in changed_record_numbers:
+                row = rows[ number ] = previous_rows[ number ]
+                if  offset_delta \
+                and row.rebase_program_image_offsets( offset_delta ):
+                    rebased_record_numbers.add( number )
+                continue
+            rows[ number ] = cls._ROW_CLASS.from_program_image(
+                program_image, base_offset + number * RECORD_SIZE,
+                number, dominions_version
+            )
+            records_done += 1
+            if None is not progress:
+                progress(
+                    cls.LABEL( ), records_done, len( changed_record_numbers )
+                )
+
+        return rows, changed_record_numbers | rebased_record_numbers
+
+
+    def is_comparable( self, dominions_version ):
+        """ Returns whether the records of this table can be compared by
+            fingerprint to those of a table for the given Dominions version,
+            which is the case when both have the same layout of records.
+            The tables may be at different places in their program images. """
+
+        # Note: The rows of tables of unknown place could not be shifted.
+        if None is self._fingerprints or None is self._base_offset:
+            return False
+
+        row_class = self._ROW_CLASS
+        try:
+            return row_class.PROGRAM_IMAGE_RECORD_LAYOUT(
+                self._dominions_version
+            ) is row_class.PROGRAM_IMAGE_RECORD_LAYOUT( dominions_version )
+        except ( AttributeError, KeyError ): return False
+
+
+    @property
+    def changed_record_numbers( self ):
+        """ Numbers of the records which were decoded anew or whose rows
+            were shifted to a new place, when extracting against a previous
+            table, or None, if all records were decoded anew. """
+
+        return self._changed_record_numbers
+
+
+    @property
+    def removed_record_numbers( self ):
+        """ Numbers of the records of a previous table
+            which are no longer present. """
+
+        return self._removed_record_numbers
+
+
+    def _persist_in_database( self, session ):
+        """ Persists all rows in database tables,
+            after preparing them for persistence. """
+
+        # Note: Rows, which are decoded on access, are only decoded once.
+        rows = list( self._table.values( ) )
+        for row in rows: row.prepare_for_persistence( )
+        session.add_all( rows )
+
+
+    def persist_changes_in_database( self, db_engine ):
+        """ Persists the rows which changed with respect to a previous table
+            in database tables, which hold the rows of the previous table.
+            All rows are persisted, if the table was not extracted against
+            a previous table. """
+
+        if None is self._changed_record_numbers:
+            return self.persist_in_database( db_engine )
+
+        Session = _SQLA_sessionmaker( bind = db_engine )
+
+        with _database_session_scope( Session ) as session:
+            self._persist_changes_in_database( session )
+
+
+    def _persist_changes_in_database( self, session ):
+        """ Replaces the persisted rows of changed or removed records.
+            (Internal version - override as needed.) """
+
+        row_class = self._ROW_CLASS
+        # Note: Deletions are flushed at once, so that related rows
+        #       are known to be deleted along with the rows they belong to.
+        with session.no_autoflush:
+            for number in sorted(
+                self._changed_record_numbers | self._removed_record_numbers
+            ):
+                row = session.get( row_class, number )
+                if None is not row: self._delete_row_graph( session, row )
+        session.flush( )
+
+        rows = [
+            self._table[ number ]
+            for number in sorted( self._changed_record_numbers )
+        ]
+        for row in rows: row.prepare_for_persistence( )
+        session.add_all( rows )
+
+
+    @classmethod
+    def _delete_row_graph( cls, session, row ):
+        """ Deletes a persisted row along with all rows
+            which are related to it. """
+
+        # Note: All related rows, such as attributes, effects, and unknown
+        #       fields, belong to exactly one row of an extracted table.
+        for relationship in _SQLA_inspect( type( row ) ).relationships:
+            related = getattr( row, relationship.key )
+            if None is related: continue
+            if not relationship.uselist: related = [ related ]
+            for related_row in related:
+                cls._delete_row_graph( session, related_row )
+
+        session.delete( row )
+
+
+    def pformat_table_rows( self,
+        tables, pformat_config = _PrettyFormatConfig( )
+    ):
+        """ Nicely formats the table rows for display.
+            Formatted rows are kept, along with the keys of the rows of this
+            table, which they look up, so that rows need not be formatted
+            again, as long as neither they nor their lookups change.
+            The labels of the other tables, which they look up, are kept
+            as well. """
+
+        pformat_config_row = pformat_config.clone(
+            key_format = self._generated_key_format( )
+        )
+        config = tuple( sorted( vars( pformat_config_row ).items( ) ) )
+        if config != self._pformatted_rows_config:
+            self._pformatted_rows           = { }
+            self._pformatted_rows_config    = config
+            self._pformatted_rows_labels    = frozenset( )
+
+        tables = TablesLookupsRecorder( tables )
+        pformatted_rows = self._pformatted_rows
+        output = [ ]
+        try:
+            for key, row in self._table.items( ):
+                pformatted_row = pformatted_rows.get( key )
+                if None is pformatted_row:
+                    self._lookups = set( )
+                    try:
+                        text = row.pformat_row(
+                            tables, pformat_config = pformat_config_row
+                        )
+                    finally: lookups, self._lookups = self._lookups, None
+                    pformatted_row = pformatted_rows[ key ] \
+                    = ( text, frozenset( lookups ) )
+                output.append( pformatted_row[ 0 ] )
+        finally:
+            self._pformatted_rows_labels \
+            = self._pformatted_rows_labels | tables.labels
+
+        return "\n".join( output )
+
+
+    def pformat_table_lookup( self,
+        key, tables, pformat_config = _PrettyFormatConfig( )
+    ):
+        """ Nicely formats a table lookup for display. """
+
+        if None is not self._lookups: self._lookups.add( key )
+
+        return super( DataTable_ProgramImage, self ).pformat_table_lookup(
+            key, tables, pformat_config = pformat_config
+        )
+
+
+    @property
+    def pformatted_rows_labels( self ):
+        """ Labels of the tables, which the formatted rows look up. """
+
+        return self._pformatted_rows_labels
+
+
+    def invalidate_pformatted_rows( self ):
+        """ Discards all formatted rows, such as when the tables,
+            which they look up, change. """
+
+        self._pformatted_rows           = None
+        self._pformatted_rows_config    = None
+        self._pformatted_rows_labels    = frozenset( )
+
+
+    def _take_pformatted_rows( self, previous ):
+        """ Takes over the formatted rows of a previous table, which neither
+            changed nor look up changed or removed rows. """
+
+        if None is previous._pformatted_rows: return
+
+        stale = self._changed_record_numbers | self._removed_record_numbers
+        self._pformatted_rows = {
+            key: pformatted_row
+            for key, pformatted_row in previous._pformatted_rows.items( )
+            if key not in stale and not stale & pformatted_row[ 1 ]
+        }
+        self._pformatted_rows_config = previous._pformatted_rows_config
+        self._pformatted_rows_labels = previous._pformatted_rows_labels
+
+
+    @classmethod
+    def rows_from_program_image( cls,
         program_image, dominions_version,
-        offsets_table_name = "_PROGRAM_IMAGE_BASE_OFFSETS"
+        records_range = None, base_offset = None, bulk = False,
+        progress = None
     ):
+        """ Extracts rows from a program image into an ordered dictionary,
+            keyed by record number. If a range of record numbers is given,
+            as a pair of start and stop numbers, then only the records
+            within that range are extracted. If the base offset of the table
+            is already known, then it is not sought again. """
+
+        if None is base_offset:
+            base_offset = cls._find_table_base_offset(
+                program_image, dominions_version
+            )
+        if None is records_range:
+            records_range = ( 0, cls._find_table_records_count(
+                program_image, base_offset, dominions_version
+            ) )
+
+        if bulk:
+            return cls._rows_from_program_image_bulk(
+                program_image, base_offset, dominions_version, records_range,
+                progress = progress
+            )
+        return cls._rows_from_program_image(
+            program_image, base_offset, dominions_version, records_range,
+            progress = progress
+        )
+
+
+    @classmethod
+    def locate_in_program_image( cls, program_image, dominions_version ):
+        """ Returns the base offset and the number of records of the table
+            within a program image, without decoding any of the records. """
+
+        base_offset = cls._find_table_base_offset(
+            program_image, dominions_version
+        )
+
+        return base_offset, cls._find_table_records_count(
+            program_image, base_offset, dominions_version
+        )
+
+
+    @classmethod
+    def _find_table_base_offset( cls, program_image, dominions_version ):
         """ Finds and returns the base offset of the table 
-            within the program image for the given Dominions version. """
+            within the program image for the given Dominions version.
+            The table is sniffed from a survey of the program image.
+            If the base offset is known for the Dominions version, then
+            the sniffed base offset is checked against it, and the known
+            base offset is used, if the table cannot be sniffed. """
 
         platform        = dominions_version.platform
         version         = dominions_version.version
 
-        base_offset = None
-        base_offsets_by_platform \
-        = getattr( cls, offsets_table_name ).get( platform )
-        if base_offsets_by_platform:
-            base_offset = base_offsets_by_platform.get( version )
+        known_base_offset = cls._PROGRAM_IMAGE_BASE_OFFSETS.get(
+            platform, { }
+        ).get( version )
 
-        if None is base_offset:
-            raise LookupError(
-                "Unable to find base offset of table for this Dominions "
-                "{version} on {platform}.".format(
+        try:
+            base_offset = _ProgramImageSurvey.from_program_image(
+                program_image
+            ).find_table_base_offset(
+                program_image,
+                cls._ROW_CLASS.PROGRAM_IMAGE_RECORD_LAYOUT( dominions_version )
+            )
+        except LookupError:
+            if None is known_base_offset: raise
+            return known_base_offset
+
+        if None is not known_base_offset and known_base_offset != base_offset:
+            raise ValueError(
+                "Sniffed base offset 0x{sniffed:X} of {title} disagrees with "
+                "known base offset 0x{known:X} for this Dominions {version} "
+                "on {platform}.".format(
+                    sniffed = base_offset, known = known_base_offset,
+                    title = cls.TITLE( ).lower( ),
                     platform = platform, version = version
                 )
             )
@@ -406,32 +1372,223 @@ class DataTable_ProgramImage( DataTable ):
 
 
     @classmethod
-    def _from_program_image(
-        cls, program_image, base_offset, dominions_version
+    def _rows_from_program_image( cls,
+        program_image, base_offset, dominions_version, records_range,
+        progress = None
     ):
-        """ Extracts the table from a program image.
+        """ Extracts a range of rows from a program image.
             (Internal version - override as needed.) """
 
         RECORD_SIZE \
         = cls._ROW_CLASS.PROGRAM_IMAGE_RECORD_SIZE( dominions_version )
+        CHUNK_SIZE  = cls._PROGRAM_IMAGE_CHUNK_SIZE
 
-        table       = _OrderedDict( )
-        offset      = base_offset
-        number      = 0
+        start, stop = records_range
+        rows = [ None ] * (stop - start)
 
-        try:
-            while True:
+        for chunk_start in range( start, stop, CHUNK_SIZE ):
+            chunk_stop = min( chunk_start + CHUNK_SIZE, stop )
 
-                table[ number ] = cls._ROW_CLASS.from_program_image(
-                    program_image, offset, number, dominions_version
+            for number in range( chunk_start, chunk_stop ):
+                rows[ number - start ] = cls._ROW_CLASS.from_program_image(
+                    program_image, base_offset + number * RECORD_SIZE,
+                    number, dominions_version
                 )
 
-                number += 1
-                offset += RECORD_SIZE
+            if None is not progress:
+                progress( cls.LABEL( ), chunk_stop - start, stop - start )
 
-        except StopIteration as exc: pass
+        return _OrderedDict( zip( range( start, stop ), rows ) )
 
-        return cls( table )
+
+    @classmethod
+    def export_raw_records(
+        cls, program_image, dominions_version, file_path_base
+    ):
+        """ Writes the raw bytes of all records of the table within
+            a program image to a file in the NumPy array format, as unsigned
+            bytes with one row per record, which can be mapped into memory.
+            An index file in JSON format beside it records the Dominions
+            version, the base offset, and the size and number
+            of the records. Returns the paths of both files. """
+
+        base_offset, records_count = cls.locate_in_program_image(
+            program_image, dominions_version
+        )
+        RECORD_SIZE \
+        = cls._ROW_CLASS.PROGRAM_IMAGE_RECORD_SIZE( dominions_version )
+
+        records_path = file_path_base + _path_extsep + "npy"
+        with open( records_path, "wb" ) as records_file:
+            records_file.write(
+                _npy_header( ( records_count, RECORD_SIZE ) )
+            )
+            records_file.write( program_image[
+                base_offset : base_offset + records_count * RECORD_SIZE
+            ] )
+
+        index_path = file_path_base + _path_extsep + "json"
+        with open( index_path, "w" ) as index_file:
+            _json.dump( _OrderedDict( [
+                ( "format_version",     cls._RAW_RECORDS_FORMAT_VERSION ),
+                ( "table",              cls.LABEL( ) ),
+                ( "platform",           dominions_version.platform ),
+                ( "dominions_version",  dominions_version.version ),
+                ( "program_digest",
+                  _program_image_digest( program_image ) ),
+                ( "base_offset",        base_offset ),
+                ( "record_size",        RECORD_SIZE ),
+                ( "records_count",      records_count ),
+            ] ), index_file, indent = 4 )
+
+        return records_path, index_path
+
+
+    @classmethod
+    def records_from_program_image( cls, program_image, dominions_version ):
+        """ Returns a structured array of all records of the table,
+            which views the program image without copying it. """
+
+        base_offset = cls._find_table_base_offset(
+            program_image, dominions_version
+        )
+
+        return cls._records_from_program_image(
+            program_image, base_offset, dominions_version
+        )
+
+
+    @classmethod
+    def _records_from_program_image(
+        cls, program_image, base_offset, dominions_version,
+        records_range = None
+    ):
+        """ Returns a structured array of all records of the table,
+            or of a range of them, which views the program image
+            without copying it. """
+
+        layout = cls._ROW_CLASS.PROGRAM_IMAGE_RECORD_LAYOUT(
+            dominions_version
+        )
+
+        if None is records_range:
+            records_range = ( 0, cls._find_table_records_count(
+                program_image, base_offset, dominions_version
+            ) )
+        start, stop = records_range
+
+        return layout.view_records(
+            program_image, base_offset + start * layout.size, stop - start
+        )
+
+
+    @classmethod
+    def _find_table_records_count(
+        cls, program_image, base_offset, dominions_version
+    ):
+        """ Finds the number of records before the end of the table,
+            without decoding any of the records. """
+
+        layout      = cls._ROW_CLASS.PROGRAM_IMAGE_RECORD_LAYOUT(
+            dominions_version
+        )
+        RECORD_SIZE = layout.size
+        END_NAME    = cls._PROGRAM_IMAGE_END_OF_TABLE_NAME
+
+        # Note: A table does not extend beyond its section.
+        __, stop_offset = _ElfImage( program_image ).range_containing(
+            base_offset
+        )
+        records_limit   = (stop_offset - base_offset) // RECORD_SIZE
+        names_offset    = base_offset + layout.field_offset( "name" )
+        names_stop      = names_offset + records_limit * RECORD_SIZE
+
+        # Note: Each strided slice gathers one byte of the name of every
+        #       record into a column. The table ends at the first record
+        #       whose name columns all match the terminating name.
+        columns = [
+            bytes(
+                program_image[ names_offset + i : names_stop : RECORD_SIZE ]
+            )
+            for i in range( len( END_NAME ) )
+        ]
+        number = columns[ 0 ].find( END_NAME[ 0 : 1 ] )
+        while -1 != number:
+            if all(
+                columns[ i ][ number ] == END_NAME[ i ]
+                for i in range( 1, len( END_NAME ) )
+            ): return number
+            number = columns[ 0 ].find( END_NAME[ 0 : 1 ], number + 1 )
+
+        raise LookupError( "Unable to find end of table." )
+
+
+    @classmethod
+    def _rows_from_program_image_bulk( cls,
+        program_image, base_offset, dominions_version, records_range,
+        progress = None
+    ):
+        """ Extracts a range of rows from a structured array view
+            of a program image. """
+
+        row_class   = cls._ROW_CLASS
+        RECORD_SIZE = row_class.PROGRAM_IMAGE_RECORD_SIZE( dominions_version )
+        start, stop = records_range
+
+        table = _OrderedDict( )
+        for number, fields, unknowns in cls._fields_from_program_image_bulk(
+            program_image, base_offset, dominions_version, records_range
+        ):
+            table[ number ] = row_class.from_program_image_fields(
+                fields, unknowns,
+                base_offset + number * RECORD_SIZE, number, dominions_version
+            )
+            if None is not progress and (
+                   not (number + 1 - start) % cls._PROGRAM_IMAGE_CHUNK_SIZE
+                or stop == number + 1
+            ): progress( cls.LABEL( ), number + 1 - start, stop - start )
+
+        return table
+
+
+    @classmethod
+    def _fields_from_program_image_bulk( cls,
+        program_image, base_offset, dominions_version, records_range
+    ):
+        """ Decodes a range of records from a structured array view
+            of a program image. Yields the record number, the decoded fields
+            and the unknown fields of each record. """
+
+        row_class   = cls._ROW_CLASS
+        layout      = row_class.PROGRAM_IMAGE_RECORD_LAYOUT(
+            dominions_version
+        )
+
+        records = cls._records_from_program_image(
+            program_image, base_offset, dominions_version, records_range
+        )
+        columns, unknowns = layout.columns_from_records( records )
+        columns = row_class.decode_program_image_columns( columns )
+
+        # Note: Conversion to lists yields native Python values,
+        #       with None for masked entries.
+        names           = list( columns.keys( ) )
+        rows            = zip( *[
+            columns[ name ].tolist( ) for name in names
+        ] )
+        unknown_offsets = list( unknowns.keys( ) )
+        unknown_rows    = zip( *[
+            column.tolist( ) for column in unknowns.values( )
+        ] ) if unknowns else _repeat( ( ) )
+        del records, columns, unknowns
+
+        for number, (row, unknown_row) in enumerate(
+            zip( rows, unknown_rows ), records_range[ 0 ]
+        ):
+            yield (
+                number, dict( zip( names, row ) ),
+                _OrderedDict( zip( unknown_offsets, unknown_row ) )
+            )
 
 
     def postprocess_extracted_table( self, program_image, dominions_version ):
@@ -456,23 +1613,6 @@ class DataTableRow_NamedInteger( DataTableRow ):
     name            = _SQLA_Column( _SQLA_String )
 
 
-    @classmethod
-    def from_dict( cls, attributes_dict ):
-        """ Creates an instance from an attributes dictionary. """
-
-        return cls(
-            number = cls.key_from_dict( attributes_dict ),
-            name = attributes_dict[ "name" ]
-        )
-
-
-    @classmethod
-    def key_from_dict( cls, attributes_dict ):
-        """ Returns value of primary key from an attributes dictionary. """
-
-        return int( attributes_dict[ cls._KEY_NAME ] )
-
-
     def _pformat_object( self,
         tables, pformat_config = _PrettyFormatConfig( )
     ):
@@ -485,6 +1625,10 @@ class DataTable_NamedInteger( DataTable ):
     """ A generic table with named integer values. """
 
 
+    # Note: Columns of tables, which are loaded from CSV data.
+    _CSV_COLUMNS    = ( ( "number", int ), ( "name", str ), )
+
+
     def __init__( self, table ):
         
         super( DataTable_NamedInteger, self ).__init__( table )
@@ -495,7 +1639,7 @@ class DataTable_NamedInteger( DataTable ):
         """ Calculates the pad width for justified display formats
             of the table keys. """
 
-        self._key_width = len( str( max( self._table.keys( ) ) ) )
+        self._key_width = len( str( max( self._table.keys( ), default = 0 ) ) )
 
 
     def _generated_key_format( self ):
@@ -520,23 +1664,6 @@ class DataTableRow_NamedBits( DataTableRow ):
     bit_name        = _SQLA_Column( _SQLA_String )
 
 
-    @classmethod
-    def from_dict( cls, attributes_dict ):
-        """ Creates an instance from an attributes dictionary. """
-
-        return cls(
-            bit_value = cls.key_from_dict( attributes_dict ),
-            bit_name = attributes_dict[ "bit_name" ]
-        )
-
-
-    @classmethod
-    def key_from_dict( cls, attributes_dict ):
-        """ Returns value of primary key from an attributes dictionary. """
-
-        return int( attributes_dict[ cls._KEY_NAME ] )
-
-
     def _pformat_object( self,
         tables, pformat_config = _PrettyFormatConfig( )
     ):
@@ -549,6 +1676,9 @@ class DataTable_NamedBits( DataTable_NamedInteger ):
     """ A generic table representing a bit mask with named positions. """
 
 
+    _CSV_COLUMNS    = ( ( "bit_value", int ), ( "bit_name", str ), )
+
+
     def pformat_table_lookup( self,
         key, tables, pformat_config = _PrettyFormatConfig( )
     ):
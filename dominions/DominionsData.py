@@ -25,14 +25,34 @@ __docformat__ = "reStructuredText"
 from collections import (
     OrderedDict             as _OrderedDict,
 )
+from bisect import (
+    bisect_right            as _bisect_right,
+)
 import functools        as _functools
+import hashlib          as _hashlib
+import pickle           as _pickle
+import threading        as _threading
+import warnings         as _warnings
+
+from concurrent.futures import (
+    ProcessPoolExecutor     as _ProcessPoolExecutor,
+    as_completed            as _futures_as_completed,
+)
 
 import os               as _os
 from os.path import (
     extsep                  as _path_extsep,
+    abspath                 as _path_absolute,
     join                    as _path_join,
+    basename                as _path_basename,
     exists                  as _path_exists,
     isdir                   as _path_is_directory,
+    dirname                 as _path_dirname,
+    getsize                 as _path_get_size,
+    getmtime                as _path_get_mtime,
+)
+from glob import (
+    glob                    as _glob,
 )
 import mmap             as _mmap
 
@@ -41,13 +61,25 @@ from sqlalchemy.orm import (
 )
 
 from dominions.utils import (
+    cache_directory_path    as _cache_directory_path,
     database_session_scope  as _database_session_scope,
     DominionsVersion        as _DominionsVersion,
     PrettyFormatConfig      as _PrettyFormatConfig,
+    PLATFORM_LINUX          as _PLATFORM_LINUX,
 )
 from dominions.DataTable import (
     DataTableRow            as _DataTableRow,
 )
+from dominions.ProgramImage import (
+    program_image_digest    as _program_image_digest,
+    program_image_from_buffer   as _program_image_from_buffer,
+    split_archive_member_path   as _split_archive_member_path,
+    read_archive_member     as _read_archive_member,
+    ProgramImageSurvey      as _ProgramImageSurvey,
+)
+from dominions.RecordStatistics import (
+    RecordStatistics        as _RecordStatistics,
+)
 from dominions.constants_tables import (
     AttributeKeys_DataTable,
     Sounds_DataTable,
@@ -86,6 +118,190 @@ from dominions.Spell import (
 )
 
 
+def _extract_rows_in_process(
+    program_path, table_type, dominions_version,
+    base_offset, records_range, bulk
+):
+    """ Extracts a range of rows of a table from a Dominions executable,
+        which is mapped anew by the worker process.
+        Returns the rows in serialized form. """
+
+    with open( program_path, "rb" ) as program_file:
+        with _mmap.mmap(
+            program_file.fileno( ), 0, prot = _mmap.PROT_READ
+        ) as program_image:
+            rows = table_type.rows_from_program_image(
+                program_image, dominions_version,
+                records_range = records_range, base_offset = base_offset,
+                bulk = bulk
+            )
+
+    return _pickle.dumps( list( rows.values( ) ), _pickle.HIGHEST_PROTOCOL )
+
+
+class DominionsDataCache( object ):
+    """ Content-addressed on-disk cache of Dominions data.
+
+        Entries are keyed by a digest of the executable, of the contents
+        of the supporting data files, and of the source code of this package,
+        so that changes to any of them lead to new entries. Entries are
+        pickled whole. The least recently used entries are evicted, once
+        the total size of the cache exceeds its limit. """
+
+
+    _DIRECTORY_NAME     = "extractions"
+    _SIZE_LIMIT         = 256 * 1024 * 1024
+
+
+    _package_digest     = None
+
+
+    def __init__( self, directory_path = None, size_limit = None ):
+
+        if None is directory_path:
+            directory_path = _path_join(
+                _cache_directory_path( ), self._DIRECTORY_NAME
+            )
+        _os.makedirs( directory_path, 0o700, exist_ok = True )
+        self._directory_path    = directory_path
+        self._size_limit        = \
+        self._SIZE_LIMIT if None is size_limit else size_limit
+
+
+    @property
+    def directory_path( self ):
+        """ Path to the directory which holds the cache entries. """
+
+        return self._directory_path
+
+
+    @classmethod
+    def package_digest( cls ):
+        """ Returns a digest of the source code of this package. """
+
+        if None is cls._package_digest:
+            hasher = _hashlib.blake2b( digest_size = 20 )
+            for file_path in sorted( _glob( _path_join(
+                _path_dirname( __file__ ), "*" + _path_extsep + "py"
+            ) ) ):
+                with open( file_path, "rb" ) as source_file:
+                    hasher.update( source_file.read( ) )
+            cls._package_digest = hasher.hexdigest( )
+
+        return cls._package_digest
+
+
+    def key( self, program_image, constants_file_paths, columnar = False ):
+        """ Returns the key of the entry for an executable
+            and supporting data files, as extracted in columnar mode or not.
+            Columnar tables are held differently and are not post-processed,
+            so they are cached apart. Bulk extraction and extraction
+            by several processes yield the same data as plain extraction. """
+
+        hasher = _hashlib.blake2b( digest_size = 20 )
+        hasher.update( self.package_digest( ).encode( "ascii" ) )
+        hasher.update( b"columnar" if columnar else b"rows" )
+        hasher.update(
+            _program_image_digest( program_image ).encode( "ascii" )
+        )
+        for file_path in constants_file_paths:
+            with open( file_path, "rb" ) as constants_file:
+                hasher.update( constants_file.read( ) )
+
+        return hasher.hexdigest( )
+
+
+    def load( self, key ):
+        """ Returns the cached data for a key, or None, if there is none. """
+
+        entry_path = self._entry_path( key )
+        try:
+            with open( entry_path, "rb" ) as entry_file:
+                dominions_data = _pickle.load( entry_file )
+        except ( IOError, OSError ): return None
+        # Note: Damaged entries are discarded.
+        except Exception:
+            self._remove( entry_path )
+            return None
+
+        # Note: The modification time of an entry marks its last use.
+        try: _os.utime( entry_path, None )
+        except OSError: pass
+
+        return dominions_data
+
+
+    def store( self, key, dominions_data ):
+        """ Stores data under a key, evicting old entries as necessary.
+            Failures are ignored, since the cache is a mere shortcut. """
+
+        entry_path = self._entry_path( key )
+        temporary_path = "{0}.{1}".format( entry_path, _os.getpid( ) )
+        try:
+            with open( temporary_path, "wb" ) as entry_file:
+                _pickle.dump(
+                    dominions_data, entry_file, _pickle.HIGHEST_PROTOCOL
+                )
+            _os.replace( temporary_path, entry_path )
+        except ( IOError, OSError ):
+            self._remove( temporary_path )
+            return
+
+        self._evict( )
+
+
+    def clear( self ):
+        """ Removes all entries from the cache. """
+
+        for entry_path in self._entry_paths( ):
+            self._remove( entry_path )
+
+
+    def _evict( self ):
+        """ Removes the least recently used entries,
+            until the cache fits within its size limit. """
+
+        entries = [ ]
+        for entry_path in self._entry_paths( ):
+            try:
+                entries.append( (
+                    _path_get_mtime( entry_path ),
+                    _path_get_size( entry_path ), entry_path
+                ) )
+            except OSError: pass
+        entries.sort( )
+
+        size = sum( entry_size for __, entry_size, __ in entries )
+        for __, entry_size, entry_path in entries:
+            if self._size_limit >= size: break
+            self._remove( entry_path )
+            size -= entry_size
+
+
+    def _entry_path( self, key ):
+        """ Returns the path of the file for an entry. """
+
+        return _path_join(
+            self._directory_path, key + _path_extsep + "pickle"
+        )
+
+
+    def _entry_paths( self ):
+        """ Returns the paths of the files of all entries. """
+
+        return _glob( _path_join(
+            self._directory_path, "*" + _path_extsep + "pickle"
+        ) )
+
+
+    @staticmethod
+    def _remove( file_path ):
+        """ Removes a file, if it exists. """
+
+        try: _os.remove( file_path )
+        except OSError: pass
+
+
 class DominionsData( object ):
     """ Supreme binder for all Dominions data. """
 
@@ -126,8 +342,21 @@ class DominionsData( object ):
     ) )
 
 
+    _PARALLEL_CHUNK_SIZE_MINIMUM    = 64
+    _CONSTANTS_TABLES_CACHE_SIZE    = 8
+    _CONSTANTS_BUNDLE_FILE_NAME     = "constants" + _path_extsep + "bundle"
+    _CONSTANTS_BUNDLE_FORMAT_VERSION    = 1
+
+
+    _constants_tables_cache     = _OrderedDict( )
+
+
     _dominions_version  = None
     _tables             = None
+    _program_image      = None
+    _lazy               = False
+    _constants_digest   = None
+    _incremental        = False
 
 
     @classmethod
@@ -141,55 +370,691 @@ class DominionsData( object ):
 
     @classmethod
     def from_program_and_data_files(
-        cls, program_path, constants_path_base
+        cls, program_path, constants_path_base, bulk = False, progress = None,
+        processes = None, cache = None, lazy = False, columnar = False,
+        previous = None, keep_program_image = False
     ):
         """ Instantiates from a Dominions executable
-            and supporting data files. """
+            and supporting data files.
+            In bulk mode, tables are extracted from structured array views
+            of the executable, which requires NumPy.
+            The optional progress callback is passed on to the extraction
+            of each table from the executable.
+            If a number of processes is given, then the tables are extracted
+            in chunks of records by a pool of worker processes, after the
+            supporting data files are loaded. Zero processes means one
+            process per processor.
+            If a cache is given, then the data are looked up in it first
+            and stored in it after extraction.
+            In lazy mode, the executable stays mapped and rows of its tables
+            are only decoded, when accessed. The instance should be closed,
+            when no longer needed. Lazy mode uses neither processes nor
+            the cache.
+            In columnar mode, the tables from the executable store decoded
+            fields in columns and only materialize row objects on access.
+            Pretty-printing and persisting in a database still work on row
+            objects, which are materialized one at a time into a bounded
+            cache. Columnar mode does not use processes.
+            If previous data, such as a loaded snapshot, are given, then only
+            the records of the executable, which changed since, are decoded,
+            formatted, and persisted anew. Incremental extraction uses neither
+            processes nor the cache.
+            If the image of the executable is kept, then it stays mapped
+            after extraction in any mode, as in lazy mode, so that record
+            statistics and raw records can be taken from it. The instance
+            should then be closed, when no longer needed.
+            The executable may be a member of a zip or tar archive, such as
+            ``builds/dom4.tar.gz/dom4/dom4_amd64``. It is then decompressed
+            into memory once and extracted as a buffer, without
+            processes. """
 
-        tables = _OrderedDict( )
+        archive_path, member_name = _split_archive_member_path( program_path )
+        if None is not member_name:
+            return cls.from_program_buffer(
+                _read_archive_member( archive_path, member_name ),
+                constants_path_base, bulk = bulk, progress = progress,
+                cache = cache, lazy = lazy, columnar = columnar,
+                previous = previous, keep_program_image = keep_program_image
+            )
 
         with open( program_path, "rb" ) as program_file:
-            with _mmap.mmap(
+            program_image = _mmap.mmap(
                 program_file.fileno( ), 0, prot = _mmap.PROT_READ
-            ) as program_image:
-
-                dominions_version \
-                = _DominionsVersion.from_program_image( program_image )
-
-                # Load tables of constants from CSV files.
-                for table_type in cls._LOADABLE_TABLE_TYPES:
-                    table = table_type.from_csv_file(
-                        _path_join(
-                            constants_path_base,
-                              table_type.FILE_NAME_BASE( )
-                            + _path_extsep + "csv"
-                        ),
-                        dominions_version
+            )
+
+        try:
+            self = cls._from_program_image_and_data_files(
+                program_image, constants_path_base,
+                _DominionsVersion.from_program_file(
+                    program_path, program_image
+                ),
+                program_path = program_path,
+                bulk = bulk, progress = progress, processes = processes,
+                cache = cache, lazy = lazy, columnar = columnar,
+                previous = previous
+            )
+        except:
+            program_image.close( )
+            raise
+
+        if lazy: pass
+        elif keep_program_image: self._program_image = program_image
+        else: program_image.close( )
+
+        return self
+
+
+    @classmethod
+    def from_program_buffer(
+        cls, program_buffer, constants_path_base, bulk = False,
+        progress = None, cache = None, lazy = False, columnar = False,
+        previous = None, keep_program_image = False
+    ):
+        """ Instantiates from an image of a Dominions executable,
+            which is held by any object supporting the buffer protocol,
+            such as bytes, a memory map, or shared memory,
+            and supporting data files.
+            The image is not copied; every table is extracted from a view
+            of the buffer. Since worker processes could not map the image,
+            tables are extracted within this process. The other modes are
+            as for extraction from files. In lazy mode, or if the image
+            is kept, the view is held until the instance is closed. """
+
+        program_image = _program_image_from_buffer( program_buffer )
+
+        try:
+            self = cls._from_program_image_and_data_files(
+                program_image, constants_path_base,
+                _ProgramImageSurvey.from_program_image(
+                    program_image
+                ).dominions_version,
+                bulk = bulk, progress = progress,
+                cache = cache, lazy = lazy, columnar = columnar,
+                previous = previous
+            )
+        except:
+            program_image.release( )
+            raise
+
+        if lazy: pass
+        elif keep_program_image: self._program_image = program_image
+        else: program_image.release( )
+
+        return self
+
+
+    @classmethod
+    def _from_program_image_and_data_files( cls,
+        program_image, constants_path_base, dominions_version,
+        program_path = None, bulk = False, progress = None, processes = None,
+        cache = None, lazy = False, columnar = False, previous = None
+    ):
+        """ Instantiates from an image of a Dominions executable
+            and supporting data files. """
+
+        if lazy:
+            tables = cls._load_constants_tables(
+                constants_path_base, dominions_version
+            )
+            for table_type in cls._EXTRACTABLE_TABLE_TYPES:
+                tables[ table_type.LABEL( ) ] \
+                = table_type.from_program_image_lazily(
+                    program_image, dominions_version
+                )
+            self = cls(
+                dominions_version, tables, program_image = program_image
+            )
+            self._lazy = True
+            return self
+
+        if None is not previous:
+            return cls._from_program_image_and_data_files_incrementally(
+                program_image, constants_path_base, dominions_version,
+                previous, bulk = bulk, progress = progress
+            )
+
+        if None is not cache:
+            cache_key = cache.key(
+                program_image, [
+                    cls._constants_file_path( constants_path_base, table_type )
+                    for table_type in cls._LOADABLE_TABLE_TYPES
+                ], columnar = columnar
+            )
+            self = cache.load( cache_key )
+            if None is not self: return self
+
+        executor = None
+        if None is not processes and not columnar:
+            executor = _ProcessPoolExecutor( max_workers = processes or None )
+
+        try:
+
+            # Note: Malformed data files are reported before extraction.
+            tables = cls._load_constants_tables(
+                constants_path_base, dominions_version
+            )
+
+            if None is not executor:
+                extractions = cls._submit_table_extractions(
+                    executor, program_path, program_image, dominions_version,
+                    processes or _os.cpu_count( ), bulk = bulk
+                )
+
+            # Extract other tables from the Dominions executable.
+            if None is not executor:
+                tables.update( cls._collect_table_extractions(
+                    extractions, program_image, dominions_version,
+                    progress = progress
+                ) )
+            elif columnar:
+                for table_type in cls._EXTRACTABLE_TABLE_TYPES:
+                    table = table_type.from_program_image_columnar(
+                        program_image, dominions_version, bulk = bulk
                     )
                     tables[ table_type.LABEL( ) ] = table
-
-                # Extract other tables from the Dominions executable.
+            else:
                 for table_type in cls._EXTRACTABLE_TABLE_TYPES:
                     table = table_type.from_program_image(
-                        program_image, dominions_version
+                        program_image, dominions_version,
+                        bulk = bulk, progress = progress
                     )
                     tables[ table_type.LABEL( ) ] = table
 
-                # TODO: Implement other extractions.
+        finally:
+            if None is not executor: executor.shutdown( )
+
+        # TODO: Implement other extractions.
 
-                self = cls( dominions_version, tables )
+        self = cls( dominions_version, tables )
+        self._constants_digest = cls._constants_digest_from_files(
+            constants_path_base
+        )
+
+        if None is not cache: cache.store( cache_key, self )
 
         return self
 
 
-    def __init__( self, dominions_version, tables ):
+    @classmethod
+    def _from_program_image_and_data_files_incrementally( cls,
+        program_image, constants_path_base, dominions_version, previous,
+        bulk = False, progress = None
+    ):
+        """ Instantiates from an image of a Dominions executable
+            and supporting data files, taking over the unchanged rows
+            of previous data. """
+
+        tables = cls._load_constants_tables(
+            constants_path_base, dominions_version
+        )
+        constants_digest = cls._constants_digest_from_files(
+            constants_path_base
+        )
+        constants_unchanged = constants_digest == previous._constants_digest
+
+        for table_type in cls._EXTRACTABLE_TABLE_TYPES:
+            table = table_type.from_program_image(
+                program_image, dominions_version,
+                bulk = bulk, progress = progress,
+                previous = previous._tables.get( table_type.LABEL( ) )
+            )
+            # Note: Formatted rows may look up changed constants.
+            if not constants_unchanged: table.invalidate_pformatted_rows( )
+            tables[ table_type.LABEL( ) ] = table
+
+        self = cls( dominions_version, tables )
+        self._constants_digest  = constants_digest
+        self._incremental       = constants_unchanged and all(
+            None is not tables[ table_type.LABEL( ) ].changed_record_numbers
+            for table_type in cls._EXTRACTABLE_TABLE_TYPES
+        )
+
+        return self
+
+
+    @classmethod
+    def load_snapshot( cls, file_path ):
+        """ Loads previously extracted data from a snapshot file.
+            Returns None, if the file is missing or unreadable. """
+
+        try:
+            with open( file_path, "rb" ) as snapshot_file:
+                self = _pickle.load( snapshot_file )
+        except ( IOError, OSError ): return None
+        # Note: Damaged or foreign snapshots are ignored.
+        except Exception: return None
+
+        if not isinstance( self, cls ): return None
+        return self
+
+
+    def save_snapshot( self, file_path ):
+        """ Saves the data to a snapshot file, replacing any previous one
+            at once. Data from lazily decoded tables cannot be saved;
+            a kept image of the executable is not saved. """
+
+        if self._lazy:
+            raise ValueError( "Cannot save snapshot of lazily decoded data." )
+
+        temporary_path = "{0}.{1}".format( file_path, _os.getpid( ) )
+        try:
+            with open( temporary_path, "wb" ) as snapshot_file:
+                _pickle.dump( self, snapshot_file, _pickle.HIGHEST_PROTOCOL )
+            _os.replace( temporary_path, file_path )
+        except:
+            try: _os.remove( temporary_path )
+            except OSError: pass
+            raise
+
+
+    @classmethod
+    def compile_constants_bundle( cls, constants_path_base ):
+        """ Compiles the CSV files of the tables of constants into a bundle
+            beside them, which holds the tables as resolved for each
+            Dominions version, with which any of the rows are tagged.
+            The bundle records the size, modification time and digest
+            of each CSV file, so that it can be recognized as stale.
+            Returns the path of the bundle. """
+
+        platform = _PLATFORM_LINUX( )
+
+        sources = [ ]
+        versioned_rows = _OrderedDict( )
+        for table_type in cls._LOADABLE_TABLE_TYPES:
+            file_path = cls._constants_file_path(
+                constants_path_base, table_type
+            )
+            sources.append( cls._constants_file_source( file_path ) )
+            with open( file_path, "r" ) as csv_file:
+                versioned_rows[ table_type ] \
+                = table_type.versioned_rows_from_csv( csv_file )
+        versions = set(
+            row_version
+            for rows in versioned_rows.values( )
+            for row_version, __, __ in rows
+            if None is not row_version
+        )
+
+        # Note: The platform does not matter to the resolution of rows.
+        resolutions = [ ]
+        for version in sorted(
+            versions, key = _DominionsVersion.key_from_version
+        ):
+            dominions_version = _DominionsVersion( platform, version )
+            tables = _OrderedDict( [
+                (
+                    table_type.LABEL( ),
+                    table_type.from_versioned_rows( rows, dominions_version )
+                )
+                for table_type, rows in versioned_rows.items( )
+            ] )
+            resolutions.append( ( version, _pickle.dumps(
+                tables, _pickle.HIGHEST_PROTOCOL
+            ) ) )
+
+        bundle = {
+            "format_version":   cls._CONSTANTS_BUNDLE_FORMAT_VERSION,
+            "package_digest":   DominionsDataCache.package_digest( ),
+            "constants_digest": cls._constants_digest_from_files(
+                constants_path_base
+            ),
+            "sources":          sources,
+            "resolutions":      resolutions,
+        }
+
+        bundle_path = cls._constants_bundle_path( constants_path_base )
+        temporary_path = "{0}.{1}".format( bundle_path, _os.getpid( ) )
+        try:
+            with open( temporary_path, "wb" ) as bundle_file:
+                _pickle.dump( bundle, bundle_file, _pickle.HIGHEST_PROTOCOL )
+            _os.replace( temporary_path, bundle_path )
+        except:
+            try: _os.remove( temporary_path )
+            except OSError: pass
+            raise
+
+        return bundle_path
+
+
+    @classmethod
+    def _load_constants_tables( cls, constants_path_base, dominions_version ):
+        """ Loads tables of constants from the compiled bundle of the CSV
+            files, if it is up to date, else from the CSV files themselves.
+            The tables are kept in serialized form per version and state
+            of the files, so that later loads within the same process,
+            such as for other executables of a batch, merely deserialize them.
+            Each load returns fresh rows, since rows are bound to
+            the database session, in which they are persisted. """
+
+        file_paths = [
+            cls._constants_file_path( constants_path_base, table_type )
+            for table_type in cls._LOADABLE_TABLE_TYPES
+        ]
+        key = (
+            _path_absolute( constants_path_base ),
+            dominions_version.platform, dominions_version.version,
+            tuple(
+                cls._constants_file_source( file_path, digest = False )
+                for file_path in file_paths
+            )
+        )
+        cache = cls._constants_tables_cache
+        serialized_tables = cache.pop( key, None )
+        if None is not serialized_tables:
+            cache[ key ] = serialized_tables
+            return _pickle.loads( serialized_tables )
+
+        serialized_tables = cls._resolve_constants_bundle(
+            cls._load_constants_bundle( constants_path_base ),
+            dominions_version
+        )
+        if None is not serialized_tables:
+            tables = _pickle.loads( serialized_tables )
+        else:
+            tables = _OrderedDict( )
+            for table_type, file_path in zip(
+                cls._LOADABLE_TABLE_TYPES, file_paths
+            ):
+                table = table_type.from_csv_file(
+                    file_path, dominions_version
+                )
+                tables[ table_type.LABEL( ) ] = table
+            serialized_tables \
+            = _pickle.dumps( tables, _pickle.HIGHEST_PROTOCOL )
+
+        cache[ key ] = serialized_tables
+        while cls._CONSTANTS_TABLES_CACHE_SIZE < len( cache ):
+            cache.popitem( last = False )
+
+        return tables
+
+
+    @classmethod
+    def _load_constants_bundle( cls, constants_path_base ):
+        """ Loads the compiled bundle of the CSV files with a single read.
+            Returns None, if the bundle is missing, unreadable, or stale.
+            The bundle is stale, if it was compiled by other code, or if any
+            CSV file differs from the recorded one in size or modification
+            time and also in digest. """
+
+        try:
+            with open(
+                cls._constants_bundle_path( constants_path_base ), "rb"
+            ) as bundle_file:
+                bundle = _pickle.loads( bundle_file.read( ) )
+        except ( IOError, OSError ): return None
+        # Note: Damaged bundles are ignored.
+        except Exception: return None
+
+        if      not isinstance( bundle, dict ) \
+            or  cls._CONSTANTS_BUNDLE_FORMAT_VERSION \
+                != bundle.get( "format_version" ) \
+            or  DominionsDataCache.package_digest( ) \
+                != bundle.get( "package_digest" ):
+            return None
+
+        file_paths = [
+            cls._constants_file_path( constants_path_base, table_type )
+            for table_type in cls._LOADABLE_TABLE_TYPES
+        ]
+        if len( file_paths ) != len( bundle[ "sources" ] ): return None
+        for file_path, source in zip( file_paths, bundle[ "sources" ] ):
+            try:
+                state = cls._constants_file_source( file_path, digest = False )
+                if state == source[ : len( state ) ]: continue
+                # Note: Files, which were merely touched, are still current.
+                name, size, __, digest \
+                = cls._constants_file_source( file_path )
+                if ( name, size, digest ) != (
+                    source[ 0 ], source[ 1 ], source[ 3 ]
+                ): return None
+            except ( IOError, OSError ): return None
+
+        return bundle
+
+
+    @classmethod
+    def _resolve_constants_bundle( cls, bundle, dominions_version ):
+        """ Returns the serialized tables of a bundle, as resolved for
+            a Dominions version, or None, if there is no bundle, or if the
+            version precedes every version, for which tables are resolved. """
+
+        if None is bundle: return None
+
+        serialized_tables = None
+        for version, tables in bundle[ "resolutions" ]:
+            if _DominionsVersion(
+                dominions_version.platform, version
+            ) > dominions_version: break
+            serialized_tables = tables
+
+        return serialized_tables
+
+
+    @classmethod
+    def _constants_bundle_path( cls, constants_path_base ):
+        """ Returns the path to the compiled bundle of the CSV files. """
+
+        return _path_join(
+            constants_path_base, cls._CONSTANTS_BUNDLE_FILE_NAME
+        )
+
+
+    @staticmethod
+    def _constants_file_source( file_path, digest = True ):
+        """ Returns the base name, size and modification time of a file,
+            followed by the digest of its contents, if requested. """
+
+        status = _os.stat( file_path )
+        source = (
+            _path_basename( file_path ), status.st_size, status.st_mtime_ns
+        )
+        if not digest: return source
+
+        with open( file_path, "rb" ) as source_file:
+            return source + ( _hashlib.blake2b(
+                source_file.read( ), digest_size = 20
+            ).hexdigest( ), )
+
+
+    @classmethod
+    def _constants_file_path( cls, constants_path_base, table_type ):
+        """ Returns the path to the CSV file of a table of constants. """
+
+        return _path_join(
+            constants_path_base,
+            table_type.FILE_NAME_BASE( ) + _path_extsep + "csv"
+        )
+
+
+    @classmethod
+    def _constants_digest_from_files( cls, constants_path_base ):
+        """ Returns a digest of the contents of the CSV files
+            of the tables of constants. """
+
+        hasher = _hashlib.blake2b( digest_size = 20 )
+        for table_type in cls._LOADABLE_TABLE_TYPES:
+            with open( cls._constants_file_path(
+                constants_path_base, table_type
+            ), "rb" ) as constants_file:
+                hasher.update( constants_file.read( ) )
+
+        return hasher.hexdigest( )
+
+
+    @classmethod
+    def _submit_table_extractions( cls,
+        executor, program_path, program_image, dominions_version,
+        workers_count, bulk = False
+    ):
+        """ Splits the extractable tables into chunks of records of similar
+            size and submits the extraction of each chunk to an executor.
+            Returns an ordered dictionary of the futures of the chunks
+            of each table type, along with the number of its records. """
+
+        locations = _OrderedDict( [
+            (
+                table_type,
+                table_type.locate_in_program_image(
+                    program_image, dominions_version
+                )
+            )
+            for table_type in cls._EXTRACTABLE_TABLE_TYPES
+        ] )
+        records_total = sum(
+            records_count for __, records_count in locations.values( )
+        )
+        chunk_size = max(
+            cls._PARALLEL_CHUNK_SIZE_MINIMUM,
+            -(-records_total // workers_count)
+        )
+
+        extractions = _OrderedDict( )
+        for table_type, (base_offset, records_count) in locations.items( ):
+            futures = _OrderedDict( )
+            for start in range( 0, records_count, chunk_size ):
+                records_range \
+                = ( start, min( start + chunk_size, records_count ) )
+                futures[ executor.submit(
+                    _extract_rows_in_process,
+                    program_path, table_type, dominions_version,
+                    base_offset, records_range, bulk
+                ) ] = records_range
+            extractions[ table_type ] = ( futures, records_count )
+
+        return extractions
+
+
+    @classmethod
+    def _collect_table_extractions( cls,
+        extractions, program_image, dominions_version, progress = None
+    ):
+        """ Waits for the chunks of extracted records and merges them
+            into tables, in the order of the table types.
+            Returns an ordered dictionary of tables, keyed by label. """
+
+        rows_by_range = { }
+        records_done = dict.fromkeys( extractions.keys( ), 0 )
+        ranges = {
+            future: ( table_type, records_range )
+            for table_type, (futures, __) in extractions.items( )
+            for future, records_range in futures.items( )
+        }
+        for future in _futures_as_completed( ranges ):
+            table_type, records_range = ranges[ future ]
+            rows_by_range[ table_type, records_range ] \
+            = _pickle.loads( future.result( ) )
+            if None is not progress:
+                records_done[ table_type ] \
+                += records_range[ 1 ] - records_range[ 0 ]
+                progress(
+                    table_type.LABEL( ), records_done[ table_type ],
+                    extractions[ table_type ][ 1 ]
+                )
+
+        tables = _OrderedDict( )
+        for table_type, (futures, __) in extractions.items( ):
+            rows = _OrderedDict( )
+            for records_range in futures.values( ):
+                rows.update( zip(
+                    range( *records_range ),
+                    rows_by_range[ table_type, records_range ]
+                ) )
+            tables[ table_type.LABEL( ) ] = table_type.from_extracted_rows(
+                rows, program_image, dominions_version
+            )
+
+        return tables
+
+
+    def __init__( self, dominions_version, tables, program_image = None ):
         
         self._dominions_version     = dominions_version
         self._tables                = tables
+        self._program_image         = program_image
+
+
+    def __getstate__( self ):
+
+        state = self.__dict__.copy( )
+        # Note: A kept image of the executable cannot be pickled.
+        state.pop( "_program_image", None )
+        return state
+
+
+    def __enter__( self ):
+
+        return self
+
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+
+        self.close( )
+
+
+    def close( self ):
+        """ Releases the image of the executable, if it is still mapped
+            or viewed for lazily decoded tables or because it was kept. """
+
+        if None is not self._program_image:
+            if isinstance( self._program_image, memoryview ):
+                self._program_image.release( )
+            else: self._program_image.close( )
+            self._program_image = None
+
+
+    @property
+    def incremental( self ):
+        """ Whether the data were extracted against previous data with the
+            same constants, so that only changes need to be persisted. """
+
+        return self._incremental
+
+
+    def reload_constants_tables( self, constants_path_base, table_types ):
+        """ Reloads tables of constants from their CSV files and swaps them
+            into the data all at once, so that readers see either the old
+            or the new tables. Only the formatted rows of tables, which look
+            up any reloaded table, are discarded.
+            Since the database no longer holds the same constants, the data
+            are afterwards persisted as a whole rather than incrementally.
+            Returns the labels of the reloaded tables. """
+
+        tables = _OrderedDict( self._tables )
+        for table_type in table_types:
+            tables[ table_type.LABEL( ) ] = table_type.from_csv_file(
+                self._constants_file_path( constants_path_base, table_type ),
+                self._dominions_version
+            )
+        labels = frozenset(
+            table_type.LABEL( ) for table_type in table_types
+        )
+
+        self._tables        = tables
+        self._incremental   = False
+
+        # Note: Rows, which are formatted concurrently with the swap,
+        #       may still look up old tables, so discard after swapping.
+        for table_type in self._EXTRACTABLE_TABLE_TYPES:
+            table = tables[ table_type.LABEL( ) ]
+            if labels & table.pformatted_rows_labels:
+                table.invalidate_pformatted_rows( )
 
+        return labels
 
-    def persist_in_database( self, db_engine ):
-        """ Persists all loaded data in a database. """
+
+    def persist_in_database( self, db_engine, incremental = False ):
+        """ Persists all loaded data in a database.
+            In incremental mode, the database is expected to hold the previous
+            data, against which these data were extracted, and only changed
+            rows are replaced. If these data were not extracted
+            incrementally, then the database is refreshed as a whole. """
+
+        if incremental and self._incremental:
+            for table_type in self._EXTRACTABLE_TABLE_TYPES:
+                self._tables[ table_type.LABEL( ) ]\
+                .persist_changes_in_database( db_engine )
+            return
 
         # Refresh the database prior to persisting objects.
         _DataTableRow.metadata.drop_all( bind = db_engine )
@@ -239,5 +1104,260 @@ class DominionsData( object ):
                     table.pprint( tables, pformat_config, stream_print )
 
 
+    def pprint_record_statistics( self,
+        dump_files_path = None, pformat_config = _PrettyFormatConfig( )
+    ):
+        """ Dumps statistics of the unknown fields and the coverage maps
+            of the records of all tables from the executable to stdout
+            or to files in a directory. The executable must still be mapped,
+            i.e., the data must have been extracted lazily or with the image
+            kept. (Requires NumPy.) """
+
+        if None is self._program_image:
+            raise ValueError(
+                "Record statistics require a mapped executable."
+            )
+
+        for table_type in self._EXTRACTABLE_TABLE_TYPES:
+            statistics = _RecordStatistics.from_program_image(
+                table_type, self._program_image, self._dominions_version
+            )
+            if None is dump_files_path:
+                print( statistics.pformat( pformat_config ) )
+                continue
+            dump_file_path = _path_join(
+                dump_files_path,
+                table_type.FILE_NAME_BASE( ) + "-statistics"
+                + _path_extsep + "txt"
+            )
+            with open( dump_file_path, "w" ) as dump_file:
+                print( statistics.pformat( pformat_config ), file = dump_file )
+
+
+    def export_raw_records( self, directory_path ):
+        """ Writes the raw records of all tables from the executable
+            to files in the NumPy array format in a directory, each with
+            an index file beside it. The executable must still be mapped,
+            i.e., the data must have been extracted lazily or with the image
+            kept. """
+
+        if None is self._program_image:
+            raise ValueError( "Raw records require a mapped executable." )
+
+        for table_type in self._EXTRACTABLE_TABLE_TYPES:
+            table_type.export_raw_records(
+                self._program_image, self._dominions_version,
+                _path_join( directory_path, table_type.FILE_NAME_BASE( ) )
+            )
+
+
+class ConstantsWatcher( object ):
+    """ Watcher of the CSV files of the tables of constants,
+        which reloads the tables of loaded data, whose files changed.
+
+        Files are polled by their sizes and modification times. Files,
+        which were merely touched, are recognized by their digests and
+        are not reloaded. The changed tables are reloaded alone and swapped
+        into the data at once. Polls are made on demand or periodically
+        by a background thread. """
+
+
+    def __init__( self, dominions_data, constants_path_base ):
+
+        self._dominions_data        = dominions_data
+        self._constants_path_base   = constants_path_base
+        self._sources               = _OrderedDict( [
+            (
+                table_type,
+                DominionsData._constants_file_source(
+                    DominionsData._constants_file_path(
+                        constants_path_base, table_type
+                    )
+                )
+            )
+            for table_type in DominionsData._LOADABLE_TABLE_TYPES
+        ] )
+        self._thread                = None
+        self._stopping              = _threading.Event( )
+
+
+    def __enter__( self ):
+
+        return self
+
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+
+        self.stop( )
+
+
+    def poll( self ):
+        """ Reloads the tables, whose CSV files changed since the last poll.
+            Returns the labels of the reloaded tables.
+            If a changed file is malformed or unreadable, then an exception
+            is raised, the data are left unchanged, and the file is checked
+            again by the next poll. """
+
+        sources = _OrderedDict( )
+        for table_type, source in self._sources.items( ):
+            file_path = DominionsData._constants_file_path(
+                self._constants_path_base, table_type
+            )
+            state = DominionsData._constants_file_source(
+                file_path, digest = False
+            )
+            if state == source[ : len( state ) ]: continue
+            sources[ table_type ] \
+            = DominionsData._constants_file_source( file_path )
+
+        # Note: Files, which were merely touched, are still current.
+        table_types = [
+            table_type for table_type, source in sources.items( )
+            if  ( source[ 1 ], source[ 3 ] )
+            !=  ( self._sources[ table_type ][ 1 ],
+                  self._sources[ table_type ][ 3 ] )
+        ]
+        labels = frozenset( )
+        if table_types:
+            labels = self._dominions_data.reload_constants_tables(
+                self._constants_path_base, table_types
+            )
+        self._sources.update( sources )
+
+        return labels
+
+
+    def start( self, interval = 1.0 ):
+        """ Starts to poll every interval, in seconds,
+            in a background thread. Failed polls are reported as warnings. """
+
+        if None is not self._thread: return
+
+        self._stopping.clear( )
+        self._thread = _threading.Thread(
+            target = self._poll_periodically, args = ( interval, ),
+            name = "ConstantsWatcher"
+        )
+        self._thread.daemon = True
+        self._thread.start( )
+
+
+    def stop( self ):
+        """ Stops polling in the background, if started. """
+
+        if None is self._thread: return
+
+        self._stopping.set( )
+        self._thread.join( )
+        self._thread = None
+
+
+    def _poll_periodically( self, interval ):
+        """ Polls every interval until stopped. """
+
+        while not self._stopping.wait( interval ):
+            try: self.poll( )
+            except ( IOError, OSError, ValueError ) as exc:
+                _warnings.warn( "Could not reload constants: {0}".format(
+                    exc
+                ) )
+
+
+class ConstantsStore( object ):
+    """ Tables of constants for every Dominions version at once.
+
+        Each CSV file is read once and every version of every row is kept.
+        The tables are resolved in advance as of each version, with which
+        any row is tagged, and as of no version, i.e., with untagged rows
+        only. The tables as of any version are then found by a binary search
+        over the tagged versions and are remembered per version, so that
+        further lookups take constant time. Tables are shared by all lookups
+        as of the same version; they are meant for serving data and should
+        not be persisted in databases. """
+
+
+    @classmethod
+    def from_data_files( cls, constants_path_base ):
+        """ Instantiates from the CSV files of the tables of constants. """
+
+        versioned_rows = _OrderedDict( )
+        for table_type in DominionsData._LOADABLE_TABLE_TYPES:
+            with open( DominionsData._constants_file_path(
+                constants_path_base, table_type
+            ), "r" ) as csv_file:
+                versioned_rows[ table_type ] \
+                = table_type.versioned_rows_from_csv( csv_file )
+
+        return cls( versioned_rows )
+
+
+    def __init__( self, versioned_rows ):
+
+        platform = _PLATFORM_LINUX( )
+        versions = sorted( set(
+            row_version
+            for rows in versioned_rows.values( )
+            for row_version, __, __ in rows
+            if None is not row_version
+        ), key = _DominionsVersion.key_from_version )
+
+        # Note: The platform does not matter to the resolution of rows.
+        resolutions = [ _OrderedDict( [
+            (
+                table_type.LABEL( ),
+                table_type( _OrderedDict( [
+                    ( key, row ) for row_version, key, row in rows
+                    if None is row_version
+                ] ) )
+            )
+            for table_type, rows in versioned_rows.items( )
+        ] ) ]
+        for version in versions:
+            dominions_version = _DominionsVersion( platform, version )
+            resolutions.append( _OrderedDict( [
+                (
+                    table_type.LABEL( ),
+                    table_type.from_versioned_rows( rows, dominions_version )
+                )
+                for table_type, rows in versioned_rows.items( )
+            ] ) )
+
+        self._versions          = versions
+        self._version_keys      = list( map(
+            _DominionsVersion.key_from_version, versions
+        ) )
+        self._resolutions       = resolutions
+        self._tables_by_version = { }
+
+
+    @property
+    def versions( self ):
+        """ Versions, with which any row is tagged, in ascending order. """
+
+        return list( self._versions )
+
+
+    def tables( self, dominions_version ):
+        """ Returns an ordered dictionary of the tables of constants
+            as of a Dominions version, keyed by label. """
+
+        version = dominions_version.version
+        tables = self._tables_by_version.get( version )
+        if None is tables:
+            tables = self._resolutions[ _bisect_right(
+                self._version_keys, dominions_version.key
+            ) ]
+            self._tables_by_version[ version ] = tables
+
+        return tables
+
+
+    def table( self, label, dominions_version ):
+        """ Returns the table of constants with a label
+            as of a Dominions version. """
+
+        return self.tables( dominions_version )[ label ]
+
+
 ###############################################################################
 # vim: set ft=python ts=4 sts=4 sw=4 et tw=79:                                #
@@ -27,7 +27,13 @@ from collections import (
     OrderedDict             as _OrderedDict,
 )
 
+try:
+    import numpy        as _numpy
+except ImportError:
+    _numpy = None
+
 from sqlalchemy import (
+    and_                    as _SQLA_and,
     Table                   as _SQLA_Table,
     Column                  as _SQLA_Column,
     ForeignKey              as _SQLA_ForeignKey,
@@ -43,6 +49,7 @@ from sqlalchemy.schema import (
     ForeignKeyConstraint    as _SQLA_ForeignKeyConstraint,
 )
 from sqlalchemy.orm import (
+    foreign                 as _SQLA_foreign,
     relationship            as _SQLA_relationship,
 )
 from sqlalchemy.orm.util import (
@@ -605,6 +612,9 @@ class FlightSprites_DataTable( _DataTable_NamedInteger, _DataTable_CSV ):
     _LABEL          = "Flight Sprites"
     _FILE_NAME_BASE = "flight-sprites"
     _ROW_CLASS      = FlightSprite
+    _CSV_COLUMNS    = (
+        ( "number", int ), ( "name", str ), ( "comments", None ),
+    )
 
 
 class ExplosionSprite( _DataTableRow_NamedInteger ):
@@ -625,6 +635,9 @@ class ExplosionSprites_DataTable( _DataTable_NamedInteger, _DataTable_CSV ):
     _LABEL          = "Explosion Sprites"
     _FILE_NAME_BASE = "explosion-sprites"
     _ROW_CLASS      = ExplosionSprite
+    _CSV_COLUMNS    = (
+        ( "number", int ), ( "name", str ), ( "comments", None ),
+    )
 
 
 class Effect( _DataTableRow ):
@@ -680,7 +693,16 @@ class Effect( _DataTableRow ):
     @classmethod
     def __declare_last__( cls ):
         # Perform late binding against abstract concrete bases.
-        cls.argument = _SQLA_relationship( EffectArgument, uselist = False )
+        # Note: Arguments of several effects share database tables,
+        #       so the union holds their rows once per effect number.
+        cls.argument = _SQLA_relationship(
+            EffectArgument, uselist = False,
+            primaryjoin = lambda: _SQLA_and(
+                cls.record_id
+                == _SQLA_foreign( EffectArgument.effect_record_id ),
+                cls.effect_number == EffectArgument.effect_number
+            )
+        )
 
 
     _KEY_NAME       = "record_id"
@@ -688,6 +710,35 @@ class Effect( _DataTableRow ):
     _AREA_BATTLEFIELD_PERCENTAGES = {
         666: 100, 663: 50, 665: 25, 664: 10, 662: 5
     }
+    _RAW_FIELD_NAMES    = (
+        "effect_number", "raw_argument", "modifiers_mask",
+        "raw_range", "raw_area", "sound_number",
+        "flight_sprite_number", "flight_sprite_length",
+        "explosion_sprite_number", "explosion_sprite_length",
+    )
+    _DECODED_FIELD_NAMES    = (
+        "effect_number", "ritual", "duration",
+        "raw_argument", "modifiers_mask",
+        "range_base", "range_per_level", "range_strength_divisor",
+        "area_base", "area_per_level", "area_battlefield_pct",
+        "sound_number",
+        "flight_sprite_number", "flight_sprite_length",
+        "explosion_sprite_number", "explosion_sprite_length",
+    )
+
+
+    @classmethod
+    def RAW_FIELD_NAMES( cls ):
+        """ Returns the names of the raw fields of an effect. """
+
+        return cls._RAW_FIELD_NAMES
+
+
+    @classmethod
+    def DECODED_FIELD_NAMES( cls ):
+        """ Returns the names of the decoded fields of an effect. """
+
+        return cls._DECODED_FIELD_NAMES
 
 
     @classmethod
@@ -699,8 +750,30 @@ class Effect( _DataTableRow ):
     ):
         """ Creates an instance from a set of raw arguments. """
 
-        args = { "effect_number": effect_number % 1000 }
-        args[ "object_type" ] = object_type
+        return cls.from_decoded_data( object_type, **cls.decode_raw_data(
+            effect_number = effect_number,
+            raw_argument = raw_argument, modifiers_mask = modifiers_mask,
+            raw_range = raw_range, raw_area = raw_area,
+            sound_number = sound_number,
+            flight_sprite_number = flight_sprite_number,
+            flight_sprite_length = flight_sprite_length,
+            explosion_sprite_number = explosion_sprite_number,
+            explosion_sprite_length = explosion_sprite_length
+        ) )
+
+
+    @classmethod
+    def decode_raw_data( cls,
+        effect_number, raw_argument, modifiers_mask,
+        raw_range, raw_area, sound_number,
+        flight_sprite_number, flight_sprite_length,
+        explosion_sprite_number, explosion_sprite_length
+    ):
+        """ Decodes a set of raw arguments into effect fields.
+            Fields which do not apply are None. """
+
+        args = dict.fromkeys( cls._DECODED_FIELD_NAMES )
+        args[ "effect_number" ] = effect_number % 1000
 
         if   10000 <= effect_number:
             args[ "ritual" ] = True
@@ -731,6 +804,95 @@ class Effect( _DataTableRow ):
             args[ "explosion_sprite_number" ] = explosion_sprite_number
             args[ "explosion_sprite_length" ] = explosion_sprite_length
 
+        return args
+
+
+    @classmethod
+    def decode_raw_columns( cls,
+        effect_number, raw_argument, modifiers_mask,
+        raw_range, raw_area, sound_number,
+        flight_sprite_number, flight_sprite_length,
+        explosion_sprite_number, explosion_sprite_length
+    ):
+        """ Decodes columns of raw arguments into columns of effect fields.
+            Entries which do not apply are masked. """
+
+        _masked = _numpy.ma.masked_array
+
+        effect_number   = effect_number.astype( _numpy.int64 )
+        raw_range       = raw_range.astype( _numpy.int64 )
+        raw_area        = raw_area.astype( _numpy.int64 )
+
+        args = { }
+        args[ "effect_number" ] = effect_number % 1000
+
+        is_ritual = 10000 <= effect_number
+        args[ "ritual" ] = _masked(
+            _numpy.ones( len( effect_number ), dtype = bool ),
+            mask = ~is_ritual
+        )
+        args[ "duration" ] = _masked(
+            effect_number // 1000,
+            mask = is_ritual | (1000 > effect_number)
+        )
+
+        args[ "raw_argument" ] = raw_argument
+        args[ "modifiers_mask" ] = modifiers_mask
+
+        is_strength_range = 0 > raw_range
+        args[ "range_strength_divisor" ] = _masked(
+            -raw_range, mask = ~is_strength_range
+        )
+        args[ "range_base" ] = _masked(
+            raw_range % 1000, mask = is_strength_range
+        )
+        args[ "range_per_level" ] = _masked(
+            raw_range // 1000, mask = is_strength_range
+        )
+
+        area_battlefield_pct = _numpy.zeros_like( raw_area )
+        for area, pct in cls._AREA_BATTLEFIELD_PERCENTAGES.items( ):
+            area_battlefield_pct[ area == raw_area ] = pct
+        is_battlefield_area = 0 < area_battlefield_pct
+        args[ "area_battlefield_pct" ] = _masked(
+            area_battlefield_pct, mask = ~is_battlefield_area
+        )
+        args[ "area_base" ] = _masked(
+            raw_area % 1000, mask = is_battlefield_area
+        )
+        args[ "area_per_level" ] = _masked(
+            raw_area // 1000, mask = is_battlefield_area
+        )
+
+        args[ "sound_number" ] = sound_number
+        is_flight_disabled = 0 > flight_sprite_number
+        args[ "flight_sprite_number" ] = _masked(
+            flight_sprite_number, mask = is_flight_disabled
+        )
+        args[ "flight_sprite_length" ] = _masked(
+            flight_sprite_length, mask = is_flight_disabled
+        )
+        is_explosion_disabled = 0 > explosion_sprite_number
+        args[ "explosion_sprite_number" ] = _masked(
+            explosion_sprite_number, mask = is_explosion_disabled
+        )
+        args[ "explosion_sprite_length" ] = _masked(
+            explosion_sprite_length, mask = is_explosion_disabled
+        )
+
+        return args
+
+
+    @classmethod
+    def from_decoded_data( cls, object_type, **decoded_data ):
+        """ Creates an instance from a set of decoded effect fields. """
+
+        args = {
+            name: value for name, value in decoded_data.items( )
+            if None is not value
+        }
+        args[ "object_type" ] = object_type
+
         self = cls( **args )
 
         self.argument = eval(
@@ -739,10 +901,11 @@ class Effect( _DataTableRow ):
             )
         )(
             effect_record_id = self.record_id,
-            raw_argument = raw_argument
+            raw_argument = args[ "raw_argument" ]
         )
 
         modifiers = [ ]
+        modifiers_mask = args[ "modifiers_mask" ]
         for bit_number in range( 64 ):
             bit_value = 2 ** bit_number
             if bit_value & modifiers_mask:
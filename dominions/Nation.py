@@ -25,6 +25,14 @@ __docformat__ = "reStructuredText"
 from collections import (
     OrderedDict                 as _OrderedDict,
 )
+from array import (
+    array                       as _array,
+)
+
+try:
+    import numpy            as _numpy
+except ImportError:
+    _numpy = None
 
 from sqlalchemy import (
     Column                      as _SQLA_Column,
@@ -40,12 +48,7 @@ from sqlalchemy.orm import (
 )
 
 from dominions.utils import (
-    from_native_uint8       as _from_native_uint8,
-    from_native_uint16      as _from_native_uint16,
-    from_native_int16       as _from_native_int16,
-    from_native_uint32      as _from_native_uint32,
-    from_native_int32       as _from_native_int32,
-    from_string             as _from_string,
+    RecordLayout            as _RecordLayout,
     PLATFORM_LINUX          as _PLATFORM_LINUX,
     PLATFORM_MACOSX         as _PLATFORM_MACOSX,
     PLATFORM_WINDOWS        as _PLATFORM_WINDOWS,
@@ -98,143 +101,218 @@ class Nation( _DataTableRow_NamedInteger, _DataTableRow_ProgramImage ):
     unknown_fields          = _SQLA_relationship( "NationUnknownField" )
 
 
-    _TITLE                      = "Nation"
-    _PROGRAM_IMAGE_RECORD_SIZES = {
-        "4.03": 1108, "4.04": 1108,
+    _TITLE                          = "Nation"
+    _PROGRAM_IMAGE_RECORD_LAYOUT_4_03   = _RecordLayout( [
+        ( "name",                       "36s" ),
+        ( "epithet",                    "36s" ),
+        ( "abbreviation",               "5s" ),
+        ( "file_name_base",             "63s" ),
+        # TEMP HACK: For decoding.
+        ( None,                         "16H" ),
+        ( "attribute_keys",             "64I" ),
+        ( "attribute_values",           "64i" ),
+        ( "troop_slots",                "90i" ),
+        ( "trailer",                    "16i" ),
+    ] )
+    _PROGRAM_IMAGE_RECORD_LAYOUTS   = {
+        "4.03": _PROGRAM_IMAGE_RECORD_LAYOUT_4_03,
+        "4.04": _PROGRAM_IMAGE_RECORD_LAYOUT_4_03,
     }
+    # Note: The troop slots are split into sections, in this order.
+    #       Each section, but the first, is introduced by its sentinel and
+    #       may only run up to a lower slot index than the first one.
+    #       The sentinel of the next section, or any other non-positive
+    #       value, ends a section.
+    _TROOP_SLOT_SECTIONS            = (
+        ( "fort_troop",             None,   90 ),
+        ( "fort_leader",            -2,     89 ),
+        ( "nonfort_troop",          -3,     89 ),
+        ( "nonfort_leader",         -4,     89 ),
+        ( "pretender",              -1,     89 ),
+    )
+    _TROOP_SLOT_INDEX_LIMIT         = 89
+
+
+    fort_troop_numbers              = ( )
+    fort_leader_numbers             = ( )
+    nonfort_troop_numbers           = ( )
+    nonfort_leader_numbers          = ( )
+    pretender_numbers               = ( )
+    unpretender_numbers             = ( )
 
 
     @classmethod
-    def from_program_image(
-        cls, program_image, base_offset, number, dominions_version
-    ):
-        """ Creates an instance from a program image. """
+    def decode_program_image_fields( cls, fields ):
+        """ Decodes derived fields from the raw fields of a record.
+            The troop slots are split into the monster numbers
+            of each kind of troop type. """
+
+        troop_slots = tuple( fields.pop( "troop_slots" ) ) \
+        + tuple( fields.pop( "trailer" ) )
+
+        slot_index, cursor, value = 0, 0, None
+        for name, sentinel, slot_index_stop in cls._TROOP_SLOT_SECTIONS:
+            if None is not sentinel and sentinel != value:
+                fields[ name + "_numbers" ] = ( )
+                continue
+            count = max( 0, slot_index_stop - slot_index )
+            window = troop_slots[ cursor : cursor + count ]
+            if "pretender" == name:
+                length = window.index( -1 ) if -1 in window else count
+            else:
+                length = next(
+                    ( i for i, slot in enumerate( window ) if 0 >= slot ),
+                    count
+                )
+            fields[ name + "_numbers" ] = window[ 0 : length ]
+            if length < count:
+                slot_index, cursor = slot_index + length, cursor + length + 1
+                value = window[ length ]
+            elif count:
+                slot_index, cursor = slot_index + count - 1, cursor + count
+                value = window[ -1 ]
 
-        # TODO: Version these constants.
-        NAME_LENGTH             = 36
-        EPITHET_LENGTH          = 36
-        GROUP_CODE_LENGTH       = 5
-        FILE_NAME_BASE_LENGTH   = 63
+        cls._split_pretender_numbers( fields )
+        fields[ "troop_slots_unused_offset" ] = cursor
+        unused_count = max( 0, cls._TROOP_SLOT_INDEX_LIMIT - slot_index )
+        fields[ "troop_slots_unused" ] \
+        = troop_slots[ cursor : cursor + unused_count ]
+
+        return fields
 
-        offset = base_offset
-        
-        args = { "number": number }
-        unknowns = _OrderedDict( )
-        
-        args[ "name" ], __ = _from_string( program_image, offset, NAME_LENGTH )
-        if "end" == args[ "name" ]: raise StopIteration( )
-        offset += NAME_LENGTH
 
-        args[ "epithet" ], __ \
-        = _from_string( program_image, offset, EPITHET_LENGTH )
-        offset += EPITHET_LENGTH
+    @classmethod
+    def decode_program_image_columns( cls, columns ):
+        """ Decodes derived columns from the raw columns
+            of a structured array of records.
+            The troop slots of all records are split at once, by locating
+            the end of each section in all records with array operations. """
+
+        troop_slots = _numpy.concatenate( (
+            columns.pop( "troop_slots" ), columns.pop( "trailer" )
+        ), axis = 1 ).astype( _numpy.int64 )
+        records_count, slots_count = troop_slots.shape
+        rows = _numpy.arange( records_count )
+        # Note: Position of each slot relative to the cursor of its record.
+        positions = _numpy.arange( slots_count )[ None, : ]
+
+        slot_index  = _numpy.zeros( records_count, _numpy.int64 )
+        cursor      = _numpy.zeros( records_count, _numpy.int64 )
+        value       = _numpy.zeros( records_count, _numpy.int64 )
+        for name, sentinel, slot_index_stop in cls._TROOP_SLOT_SECTIONS:
+            count = _numpy.maximum( 0, slot_index_stop - slot_index )
+            if None is not sentinel: count[ sentinel != value ] = 0
+            relative = positions - cursor[ :, None ]
+            window = ( 0 <= relative ) & ( relative < count[ :, None ] )
+            if "pretender" == name: is_end = -1 == troop_slots
+            else:                   is_end = 0 >= troop_slots
+            is_end &= window
+            has_end = is_end.any( axis = 1 )
+            length = _numpy.where(
+                has_end, is_end.argmax( axis = 1 ) - cursor, count
+            )
+            columns[ name + "_numbers" ] = cls._split_troop_slots_column(
+                troop_slots, window & ( relative < length[ :, None ] )
+            )
+            last = _numpy.where( has_end, cursor + length, cursor + count - 1 )
+            value = _numpy.where(
+                has_end | ( 0 < count ),
+                troop_slots[ rows, _numpy.clip( last, 0, slots_count - 1 ) ],
+                value
+            )
+            slot_index = _numpy.where(
+                has_end, slot_index + length,
+                _numpy.where( 0 < count, slot_index + count - 1, slot_index )
+            )
+            cursor = _numpy.where(
+                has_end, cursor + length + 1, cursor + count
+            )
 
-        args[ "abbreviation" ], __ \
-        = _from_string( program_image, offset, GROUP_CODE_LENGTH )
-        offset += GROUP_CODE_LENGTH
+        numbers = columns[ "pretender_numbers" ]
+        columns[ "unpretender_numbers" ] = _numpy.empty(
+            records_count, dtype = object
+        )
+        for number in range( records_count ):
+            fields = { "pretender_numbers": numbers[ number ] }
+            cls._split_pretender_numbers( fields )
+            numbers[ number ] = fields[ "pretender_numbers" ]
+            columns[ "unpretender_numbers" ][ number ] \
+            = fields[ "unpretender_numbers" ]
+
+        relative = positions - cursor[ :, None ]
+        columns[ "troop_slots_unused_offset" ] = cursor
+        columns[ "troop_slots_unused" ] = cls._split_troop_slots_column(
+            troop_slots,
+              ( 0 <= relative )
+            & ( relative < _numpy.maximum(
+                0, cls._TROOP_SLOT_INDEX_LIMIT - slot_index
+            )[ :, None ] )
+        )
 
-        args[ "file_name_base" ], __ \
-        = _from_string( program_image, offset, FILE_NAME_BASE_LENGTH )
-        offset += FILE_NAME_BASE_LENGTH
+        return columns
 
-        # TEMP HACK: For decoding.
-        for i in range( 16 ):
-            unknowns[ offset - base_offset ], offset \
-            = _from_native_uint16( program_image, offset )
-
-        attribute_keys = [ ]
-        for i in range( 64 ):
-            attribute_key, offset \
-            = _from_native_uint32( program_image, offset )
-            attribute_keys.append( attribute_key )
-
-        attribute_values = [ ]
-        for i in range( 64 ):
-            attribute_value, offset \
-            = _from_native_int32( program_image, offset )
-            attribute_values.append( attribute_value )
-
-#        unknowns[ offset - base_offset ], offset \
-#        = _from_native_uint32( program_image, offset )
-
-        # 90 troop type slots at end
-
-        args[ "fort_troop_types" ] = [ ]
-        for slot_idx in range( 90 ):
-            monster_number, offset \
-            = _from_native_int32( program_image, offset )
-            if 0 >= monster_number: break
-            troop_type = NationFortTroopType(
-                nation_number = number, monster_number = monster_number
-            )
-            args[ "fort_troop_types" ].append( troop_type )
-
-        if -2 == monster_number:
-            args[ "fort_leader_types" ] = [ ]
-            for slot_idx in range( slot_idx, 89 ):
-                monster_number, offset \
-                = _from_native_int32( program_image, offset )
-                if 0 >= monster_number: break
-                troop_type = NationFortLeaderType(
-                    nation_number = number, monster_number = monster_number
-                )
-                args[ "fort_leader_types" ].append( troop_type )
-
-        if -3 == monster_number:
-            args[ "nonfort_troop_types" ] = [ ]
-            for slot_idx in range( slot_idx, 89 ):
-                monster_number, offset \
-                = _from_native_int32( program_image, offset )
-                if 0 >= monster_number: break
-                troop_type = NationNonfortTroopType(
-                    nation_number = number, monster_number = monster_number
-                )
-                args[ "nonfort_troop_types" ].append( troop_type )
-
-        if -4 == monster_number:
-            args[ "nonfort_leader_types" ] = [ ]
-            for slot_idx in range( slot_idx, 89 ):
-                monster_number, offset \
-                = _from_native_int32( program_image, offset )
-                if 0 >= monster_number: break
-                troop_type = NationNonfortLeaderType(
-                    nation_number = number, monster_number = monster_number
-                )
-                args[ "nonfort_leader_types" ].append( troop_type )
-
-        if -1 == monster_number:
-            args[ "pretender_types" ] = [ ]
-            args[ "unpretender_types" ] = [ ]
-            monster_numbers = set( )
-            for slot_idx in range( slot_idx, 89 ):
-                monster_number, offset \
-                = _from_native_int32( program_image, offset )
-                if monster_number in monster_numbers:
-                    continue
-                else:
-                    monster_numbers.add( monster_number )
-                if -1 == monster_number: break
-                if 0 == monster_number: continue
-                if 0 < monster_number:
-                    troop_type = NationPretenderType(
-                        nation_number = number,
-                        monster_number = monster_number
-                    )
-                    args[ "pretender_types" ].append( troop_type )
-                else:
-                    troop_type = NationUnpretenderType(
-                        nation_number = number,
-                        monster_number = -monster_number
-                    )
-                    args[ "unpretender_types" ].append( troop_type )
 
+    @staticmethod
+    def _split_troop_slots_column( troop_slots, mask ):
+        """ Returns a column with a tuple of the masked troop slots
+            of each record. """
+
+        counts = mask.sum( axis = 1 )
+        column = _numpy.empty( len( counts ), dtype = object )
+        for number, slots in enumerate( _numpy.split(
+            troop_slots[ mask ], _numpy.cumsum( counts )[ : -1 ]
+        ) ): column[ number ] = tuple( slots.tolist( ) )
+
+        return column
+
+
+    @staticmethod
+    def _split_pretender_numbers( fields ):
+        """ Splits the pretender section of the troop slots into the monster
+            numbers of the pretenders and of the excluded pretenders.
+            Repeated monster numbers and empty slots are dropped. """
+
+        numbers = tuple( dict.fromkeys( fields[ "pretender_numbers" ] ) )
+        fields[ "pretender_numbers" ] = tuple(
+            number for number in numbers if 0 < number
+        )
+        fields[ "unpretender_numbers" ] = tuple(
+            -number for number in numbers if 0 > number
+        )
+
+
+    @classmethod
+    def from_program_image_fields(
+        cls, fields, unknowns, base_offset, number, dominions_version
+    ):
+        """ Creates an instance from the decoded fields of a record. """
+
+        layout = cls.PROGRAM_IMAGE_RECORD_LAYOUT( dominions_version )
+
+        args = { "number": number }
+        for name in [ "name", "epithet", "abbreviation", "file_name_base" ]:
+            args[ name ] = fields[ name ]
+
+        # Note: Monster numbers are kept in compact arrays. Rows for the
+        #       troop types are only created for persistence.
+        for name in _TROOP_TYPE_CLASSES.keys( ):
+            numbers = fields[ name + "_numbers" ]
+            if numbers: args[ name + "_numbers" ] = _array( "q", numbers )
+
+        # Note: Each sentinel consumes a slot. So, the unused slots
+        #       can run past the last troop slot and into the record trailer.
         # Note: Should not have any non-zero values.
-        for slot_idx in range( slot_idx, 89):
-            unknowns[ offset - base_offset ], offset \
-            = _from_native_int32( program_image, offset )
+        unused_offset = layout.field_offset( "troop_slots" ) \
+        + 4 * fields[ "troop_slots_unused_offset" ]
+        unknowns.update( zip(
+            range( unused_offset, unused_offset + 4 * 90, 4 ),
+            fields[ "troop_slots_unused" ]
+        ) )
 
         attributes = [ ]
-        for key, value in zip( attribute_keys, attribute_values ):
+        for key, value in zip(
+            fields[ "attribute_keys" ], fields[ "attribute_values" ]
+        ):
             if not key: continue
             attributes.append( _NationAttribute.from_raw_data(
                 nation_number = number,
@@ -254,6 +332,19 @@ class Nation( _DataTableRow_NamedInteger, _DataTableRow_ProgramImage ):
         return cls( **args )
 
 
+    def prepare_for_persistence( self ):
+        """ Creates the rows of the troop types of the nation
+            from their monster numbers. """
+
+        for name, troop_type_class in _TROOP_TYPE_CLASSES.items( ):
+            setattr( self, name + "_types", [
+                troop_type_class(
+                    nation_number = self.number, monster_number = number
+                )
+                for number in getattr( self, name + "_numbers" )
+            ] )
+
+
     def pformat_row( self,
         tables, pformat_config = _PrettyFormatConfig( )
     ):
@@ -334,44 +425,44 @@ class Nation( _DataTableRow_NamedInteger, _DataTableRow_ProgramImage ):
 
         indent_1 = indent + 4 * " "
 
-        if self.unpretender_types:
+        if self.unpretender_numbers:
             output.append( indent + "Excluded Pretenders {#delgod}" )
-            for troop_type in self.unpretender_types:
+            for monster_number in self.unpretender_numbers:
                 # TODO: Fill out via table lookup.
-                output.append( indent_1 + str( troop_type.monster_number ) )
-        if self.pretender_types:
+                output.append( indent_1 + str( monster_number ) )
+        if self.pretender_numbers:
             output.append( indent + "Pretenders {#addgod}" )
-            for troop_type in self.pretender_types:
+            for monster_number in self.pretender_numbers:
                 # TODO: Fill out via table lookup.
-                output.append( indent_1 + str( troop_type.monster_number ) )
-        if self.fort_leader_types:
+                output.append( indent_1 + str( monster_number ) )
+        if self.fort_leader_numbers:
             output.append(
                 indent + "Recruitable Leaders (Fortification) {#addreccom}"
             )
-            for troop_type in self.fort_leader_types:
+            for monster_number in self.fort_leader_numbers:
                 # TODO: Fill out via table lookup.
-                output.append( indent_1 + str( troop_type.monster_number ) )
-        if self.fort_troop_types:
+                output.append( indent_1 + str( monster_number ) )
+        if self.fort_troop_numbers:
             output.append(
                 indent + "Recruitable Troops (Fortification) {#addrecunit}"
             )
-            for troop_type in self.fort_troop_types:
+            for monster_number in self.fort_troop_numbers:
                 # TODO: Fill out via table lookup.
-                output.append( indent_1 + str( troop_type.monster_number ) )
-        if self.nonfort_leader_types:
+                output.append( indent_1 + str( monster_number ) )
+        if self.nonfort_leader_numbers:
             output.append(
                 indent + "Recruitable Leaders (Foreign) {#addforeigncom}"
             )
-            for troop_type in self.nonfort_leader_types:
+            for monster_number in self.nonfort_leader_numbers:
                 # TODO: Fill out via table lookup.
-                output.append( indent_1 + str( troop_type.monster_number ) )
-        if self.nonfort_troop_types:
+                output.append( indent_1 + str( monster_number ) )
+        if self.nonfort_troop_numbers:
             output.append(
                 indent + "Recruitable Troops (Foreign) {#addforeignunit}"
             )
-            for troop_type in self.nonfort_troop_types:
+            for monster_number in self.nonfort_troop_numbers:
                 # TODO: Fill out via table lookup.
-                output.append( indent_1 + str( troop_type.monster_number ) )
+                output.append( indent_1 + str( monster_number ) )
 
         if self.attributes:
             for attribute in self.attributes:
@@ -465,6 +556,16 @@ class NationUnpretenderType( _NationTroopType ):
     __tablename__   = "unpretender_types_by_nation"
 
 
+_TROOP_TYPE_CLASSES = _OrderedDict( [
+    ( "fort_troop",         NationFortTroopType ),
+    ( "fort_leader",        NationFortLeaderType ),
+    ( "nonfort_troop",      NationNonfortTroopType ),
+    ( "nonfort_leader",     NationNonfortLeaderType ),
+    ( "pretender",          NationPretenderType ),
+    ( "unpretender",        NationUnpretenderType ),
+] )
+
+
 class _NationAttribute( _Nation_ForeignKey, _Attribute_ForeignKey ):
     
 
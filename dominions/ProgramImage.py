@@ -0,0 +1,863 @@
+###############################################################################
+#                                dominions                                    #
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+""" Sniffing of tables and other landmarks within Dominions executables. """
+
+
+__docformat__ = "reStructuredText"
+
+
+from collections import (
+    namedtuple              as _namedtuple,
+    OrderedDict             as _OrderedDict,
+)
+import hashlib          as _hashlib
+import json             as _json
+import re               as _re
+import struct           as _struct
+import weakref          as _weakref
+
+import os               as _os
+from os.path import (
+    abspath                 as _path_absolute,
+    join                    as _path_join,
+    split                   as _path_split,
+    isfile                  as _path_is_file,
+)
+import mmap             as _mmap
+import tarfile          as _tarfile
+import zipfile          as _zipfile
+
+try:
+    import numpy        as _numpy
+except ImportError:
+    _numpy = None
+
+from dominions.utils import (
+    cache_directory_path    as _cache_directory_path,
+    PLATFORM_LINUX          as _PLATFORM_LINUX,
+    PLATFORM_MACOSX         as _PLATFORM_MACOSX,
+    PLATFORM_WINDOWS        as _PLATFORM_WINDOWS,
+    DominionsVersion        as _DominionsVersion,
+)
+
+
+_PLATFORMS_BY_MAGIC = (
+    ( b"\x7fELF",           _PLATFORM_LINUX( ) ),
+    ( b"\xcf\xfa\xed\xfe",  _PLATFORM_MACOSX( ) ),
+    ( b"\xce\xfa\xed\xfe",  _PLATFORM_MACOSX( ) ),
+    ( b"MZ",                _PLATFORM_WINDOWS( ) ),
+)
+_RE_SECTION_NAME    = _re.compile( br"([^\0]+)\0" )
+_ELF_SECTION_TYPE_NOBITS    = 8
+
+
+ElfSection = _namedtuple( "ElfSection", "name address offset size" )
+StrideCandidate = _namedtuple( "StrideCandidate", "stride score" )
+TableCandidate = _namedtuple(
+    "TableCandidate", "base_offset stride records_count terminated"
+)
+
+
+def program_image_digest( program_image ):
+    """ Returns a digest of the contents of a program image. """
+
+    return _hashlib.blake2b( program_image, digest_size = 20 ).hexdigest( )
+
+
+def program_image_from_buffer( program_buffer ):
+    """ Returns a read-only view of the unsigned bytes of any object,
+        which supports the buffer protocol, for use as a program image.
+        The contents of the buffer are not copied. """
+
+    program_image = memoryview( program_buffer )
+    if not program_image.c_contiguous:
+        raise ValueError( "Program image buffer must be contiguous." )
+
+    return program_image.cast( "B" ).toreadonly( )
+
+
+def split_archive_member_path( program_path ):
+    """ Splits a path, which leads through a zip or tar archive to one of its
+        members, such as ``builds/dom4.tar.gz/dom4/dom4_amd64``, into the path
+        of the archive and the name of the member. The name of the member
+        is None, if the path does not lead into an archive. """
+
+    member_names = [ ]
+    archive_path = program_path
+    while archive_path and not _path_is_file( archive_path ):
+        head, tail = _path_split( archive_path )
+        if head == archive_path: break
+        if tail: member_names.insert( 0, tail )
+        archive_path = head
+    if not member_names or not _path_is_file( archive_path ):
+        return program_path, None
+    if      not _zipfile.is_zipfile( archive_path ) \
+        and not _tarfile.is_tarfile( archive_path ):
+        return program_path, None
+
+    return archive_path, "/".join( member_names )
+
+
+def read_archive_member( archive_path, member_name ):
+    """ Returns the decompressed contents of a member of a zip or tar archive,
+        which are read into memory at once. """
+
+    if _zipfile.is_zipfile( archive_path ):
+        with _zipfile.ZipFile( archive_path ) as archive:
+            try: return archive.read( member_name )
+            except KeyError: pass
+    else:
+        with _tarfile.open( archive_path, "r:*" ) as archive:
+            # Note: Members of tarballs may be named relative to "./".
+            for name in ( member_name, "./" + member_name ):
+                try: member = archive.getmember( name )
+                except KeyError: continue
+                member_file = archive.extractfile( member )
+                if None is member_file: break
+                with member_file: return member_file.read( )
+
+    raise IOError( "No such file in archive {0}: {1}".format(
+        archive_path, member_name
+    ) )
+
+
+def program_image_platform( program_image ):
+    """ Returns the platform of a program image, according to its magic
+        number, or None, if the format of the image is not recognized. """
+
+    for magic, platform in _PLATFORMS_BY_MAGIC:
+        if magic == program_image[ 0 : len( magic ) ]: return platform
+
+    return None
+
+
+def _elf_formats( program_image ):
+    """ Returns the byte order and the word format of an ELF program image,
+        or None for each, if the image is not in ELF format. """
+
+    if b"\x7fELF" != program_image[ 0 : 4 ]: return None, None
+
+    elf_class, elf_data = bytearray( program_image[ 4 : 6 ] )
+    byte_order  = { 1: "<", 2: ">" }.get( elf_data )
+    word_format = { 1: "I", 2: "Q" }.get( elf_class )
+    if None is byte_order or None is word_format: return None, None
+
+    return byte_order, word_format
+
+
+def elf_sections( program_image ):
+    """ Returns an ordered dictionary of the sections of an ELF program image,
+        which have contents in the image, keyed by name. The dictionary is
+        empty, if the image has no valid table of sections. """
+
+    sections = _OrderedDict( )
+    byte_order, word_format = _elf_formats( program_image )
+    if None is byte_order: return sections
+
+    if "I" == word_format:
+        header_format, header_offset = "IxxxxxxxxxxHHH", 0x20
+        section_format = "IIxxxxIII"
+    else:
+        header_format, header_offset = "QxxxxxxxxxxHHH", 0x28
+        section_format = "IIxxxxxxxxQQQ"
+    section_struct = _struct.Struct( byte_order + section_format )
+
+    try:
+        table_offset, entry_size, entries_count, names_index \
+        = _struct.unpack_from(
+            byte_order + header_format, program_image, header_offset
+        )
+        if not table_offset or section_struct.size > entry_size:
+            return sections
+        headers = [
+            section_struct.unpack_from(
+                program_image, table_offset + index * entry_size
+            )
+            for index in range( entries_count )
+        ]
+        __, __, __, names_offset, __ = headers[ names_index ]
+    except ( _struct.error, IndexError ): return sections
+
+    for name_offset, section_type, address, offset, size in headers:
+        if _ELF_SECTION_TYPE_NOBITS == section_type: continue
+        match = _RE_SECTION_NAME.match(
+            program_image, names_offset + name_offset
+        )
+        if None is match: continue
+        name = match.group( 1 ).decode( "latin-1" )
+        sections[ name ] = ElfSection( name, address, offset, size )
+
+    return sections
+
+
+def detect_dominions_version( program_image ):
+    """ Detects the Dominions version of a program image.
+        The version string is found by the survey of the image, which
+        also serves the lookups of its tables. """
+
+    return ProgramImageSurvey.from_program_image(
+        program_image
+    ).dominions_version
+
+
+class ElfImage( object ):
+    """ Sections of a program image.
+
+        Scans can be restricted to the sections, which hold data.
+        Images in other formats than ELF have no sections, so that they
+        are scanned whole. """
+
+
+    _SCANNED_SECTION_NAMES  = ( ".rodata", ".data" )
+
+
+    def __init__( self, program_image ):
+
+        self._image_size    = len( program_image )
+        self._sections      = elf_sections( program_image )
+
+
+    @property
+    def sections( self ):
+        """ Ordered dictionary of the sections of the image, keyed by name. """
+
+        return self._sections
+
+
+    def scan_ranges( self, section_names = None ):
+        """ Returns a list of pairs of start and stop offsets of the named
+            sections of the image, in order of the names. By default,
+            the sections with read-only and writable data are named.
+            The whole image is one range, if none of the sections exist. """
+
+        if None is section_names: section_names = self._SCANNED_SECTION_NAMES
+
+        ranges = [
+            ( section.offset, section.offset + section.size )
+            for section in map( self._sections.get, section_names )
+            if None is not section
+        ]
+
+        return ranges or [ ( 0, self._image_size ) ]
+
+
+    def range_containing( self, offset ):
+        """ Returns the start and stop offsets of the section, which contains
+            an offset, or those of the whole image, if no section does. """
+
+        section = self._section_containing_offset( offset )
+        if None is section: return 0, self._image_size
+
+        return section.offset, section.offset + section.size
+
+
+    def _section_containing_offset( self, offset ):
+        """ Returns the section, which contains an offset within the image,
+            or None, if there is none. """
+
+        for section in self._sections.values( ):
+            if section.offset <= offset < section.offset + section.size:
+                return section
+
+        return None
+
+
+class ProgramImageSurvey( object ):
+    """ Landmarks found by a single scan of a program image.
+
+        The scan searches for the version string and for every record named
+        "end", which terminates a table, at once. A terminator must follow
+        a NUL, so that words ending in "end" are not taken for one.
+        Only the data sections of an ELF image are scanned. The base offset
+        of a table is then found by walking backwards from a terminator,
+        at the stride of the table, over records which have plausible names,
+        without leaving the section of the terminator. Records with empty
+        names may appear within a table, but never start it.
+
+        Surveys are cached by the program image object, so that repeated
+        lookups within the same image need neither further scans nor
+        digests of the image. Surveys are also cached by the digest of the
+        program image, so that other images of the same executable need
+        no further scans. """
+
+
+    # Note: Alternatives which begin with distinct literals are much faster
+    #       to scan for than alternatives which are whole groups, or than
+    #       alternatives which begin with lookbehinds. Terminators must
+    #       follow a NUL, which is checked for each match instead.
+    _RE_LANDMARKS       = _re.compile(
+        br"(?:end|version (?P<version>\d\.\d{2}[a-z]?))\0"
+    )
+    _RE_NAME            = _re.compile( br"[\x20-\x7e\xa0-\xff]*\Z" )
+    _MINIMUM_RECORDS_COUNT  = 16
+    _CACHE_SIZE             = 16
+    _cache                  = _OrderedDict( )
+    _cache_by_image         = { }
+
+
+    @classmethod
+    def from_program_image( cls, program_image, digest = None ):
+        """ Returns the survey of a program image,
+            scanning the image, if it has not been surveyed before.
+            The digest of the image may be given, if already known.
+            Images, which cannot be referenced weakly, such as bytes,
+            are digested on every lookup. """
+
+        image_key = id( program_image )
+        entry = cls._cache_by_image.get( image_key )
+        if None is not entry and entry[ 0 ]( ) is program_image:
+            return entry[ 1 ]
+
+        if None is digest: digest = program_image_digest( program_image )
+
+        self = cls._cache.pop( digest, None )
+        if None is self:
+            self = cls( program_image, digest )
+        cls._cache[ digest ] = self
+        while cls._CACHE_SIZE < len( cls._cache ):
+            cls._cache.popitem( last = False )
+
+        cache_by_image = cls._cache_by_image
+        def forget_image( reference ):
+            entry = cache_by_image.get( image_key )
+            if None is not entry and reference is entry[ 0 ]:
+                del cache_by_image[ image_key ]
+        try: reference = _weakref.ref( program_image, forget_image )
+        except TypeError: pass
+        else: cache_by_image[ image_key ] = ( reference, self )
+
+        return self
+
+
+    def __init__( self, program_image, digest = None ):
+
+        self._digest            = digest
+        self._platform          = program_image_platform( program_image )
+        self._elf_image         = ElfImage( program_image )
+        self._version           = None
+        self._end_offsets       = [ ]
+        self._base_offsets      = { }
+
+        for start, stop in self._elf_image.scan_ranges( ):
+            for match in self._RE_LANDMARKS.finditer(
+                program_image, start, stop
+            ):
+                if None is match.group( "version" ):
+                    end_offset = match.start( )
+                    # Note: Words, such as "Legend", end with "end" too.
+                    if end_offset and program_image[ end_offset - 1 ]:
+                        continue
+                    self._end_offsets.append( ( end_offset, start ) )
+                elif None is self._version:
+                    self._version = match.group( "version" ).decode( "ascii" )
+
+
+    @property
+    def digest( self ):
+        """ Digest of the surveyed program image. """
+
+        return self._digest
+
+
+    @property
+    def elf_image( self ):
+        """ Sections of the surveyed program image. """
+
+        return self._elf_image
+
+
+    @property
+    def dominions_version( self ):
+        """ Dominions version of the surveyed program image. """
+
+        if None is self._platform or None is self._version:
+            raise LookupError( "Could not determine Dominions version." )
+
+        return _DominionsVersion( self._platform, self._version )
+
+
+    def find_table_base_offset( self, program_image, layout ):
+        """ Finds and returns the base offset of the table with records of the
+            given layout, which must have a name field. The table, with the
+            most records before its terminator, is chosen. """
+
+        RECORD_SIZE = layout.size
+        name_offset = layout.field_offset( "name" )
+
+        key = ( RECORD_SIZE, name_offset, layout.field_size( "name" ) )
+        if key in self._base_offsets: return self._base_offsets[ key ]
+
+        base_offset     = None
+        records_count   = 0
+        for end_offset, start_offset in self._end_offsets:
+            offset = end_offset - name_offset
+            first_offset = None
+            while True:
+                offset -= RECORD_SIZE
+                if start_offset > offset: break
+                name = self._find_record_name( program_image, offset, layout )
+                if None is name: break
+                if name: first_offset = offset
+            if None is first_offset: continue
+            count = (end_offset - name_offset - first_offset) // RECORD_SIZE
+            if self._MINIMUM_RECORDS_COUNT > count: continue
+            if records_count < count:
+                base_offset, records_count = first_offset, count
+
+        if None is base_offset:
+            raise LookupError(
+                "Unable to find table with records of {0} bytes.".format(
+                    RECORD_SIZE
+                )
+            )
+
+        self._base_offsets[ key ] = base_offset
+        return base_offset
+
+
+    def _find_record_name( self, program_image, offset, layout ):
+        """ Returns the raw name of the record at the given offset,
+            or None, if no plausible record starts there.
+            A plausible record has a name of printable characters, padded with
+            NUL up to the size of its field. Records with empty names must
+            have other data. """
+
+        if 0 > offset: return None
+
+        name_offset = offset + layout.field_offset( "name" )
+        name, __, padding = bytes( program_image[
+            name_offset : name_offset + layout.field_size( "name" )
+        ] ).partition( b"\0" )
+        if padding.strip( b"\0" ) or not self._RE_NAME.match( name ):
+            return None
+        if not name and not bytes( program_image[
+            offset : offset + layout.size
+        ] ).strip( b"\0" ): return None
+
+        return name
+
+
+class RecordStrideDetector( object ):
+    """ Detector of the record strides and boundaries of tables
+        within a region of a program image.
+
+        Records of Dominions tables start with, or at least contain,
+        NUL-terminated names. The offsets of the names within the region
+        recur at the stride of a table, so that the most frequent distances
+        between nearby names are candidate strides. Alternatively, the
+        autocorrelation of the byte values of the region peaks at strides.
+        Runs of names at a candidate stride are candidate tables. """
+
+
+    _RE_NAME_START      = _re.compile(
+        br"(?<![\x20-\x7e\xa0-\xff])[\x20-\x7e\xa0-\xff]{2,}\0"
+    )
+    _RE_NAME            = _re.compile( br"[\x20-\x7e\xa0-\xff]{2,}\0" )
+    _NAME_NEIGHBORS_COUNT   = 8
+    _MINIMUM_STRIDE         = 32
+    _MAXIMUM_STRIDE         = 4096
+    _MINIMUM_RECORDS_COUNT  = 16
+    _WINDOW_STRIDES_COUNT   = 4
+    _HARMONICS_COUNT        = 16
+
+
+    @classmethod
+    def MAXIMUM_STRIDE( cls ):
+        """ Largest record stride, which is considered by default. """
+
+        return cls._MAXIMUM_STRIDE
+
+
+    @classmethod
+    def MINIMUM_RECORDS_COUNT( cls ):
+        """ Least number of records of a candidate table. """
+
+        return cls._MINIMUM_RECORDS_COUNT
+
+
+    def __init__( self, program_image, start = None, stop = None ):
+
+        if None is start: start = 0
+        if None is stop: stop = len( program_image )
+        self._program_image     = program_image
+        self._start             = start
+        self._stop              = stop
+        self._name_offsets      = None
+
+
+    @property
+    def name_offsets( self ):
+        """ Ascending offsets of the NUL-terminated names in the region. """
+
+        if None is self._name_offsets:
+            self._name_offsets = [
+                match.start( ) for match in self._RE_NAME_START.finditer(
+                    self._program_image, self._start, self._stop
+                )
+            ]
+
+        return self._name_offsets
+
+
+    def strides_from_names( self, maximum_stride = None, limit = 8 ):
+        """ Returns the most likely strides, according to the distances
+            between names, as stride candidates, best first. The score of
+            a candidate is the number of pairs of names at its distance. """
+
+        if None is maximum_stride: maximum_stride = self._MAXIMUM_STRIDE
+        MINIMUM_STRIDE = self._MINIMUM_STRIDE
+
+        name_offsets = self.name_offsets
+        counts = { }
+        for index, offset in enumerate( name_offsets ):
+            for next_offset in name_offsets[
+                index + 1 : index + 1 + self._NAME_NEIGHBORS_COUNT
+            ]:
+                stride = next_offset - offset
+                if maximum_stride < stride: break
+                if MINIMUM_STRIDE > stride: continue
+                counts[ stride ] = counts.get( stride, 0 ) + 1
+
+        return self._choose_strides( counts.items( ), limit )
+
+
+    def strides_from_autocorrelation( self, maximum_stride = None, limit = 8 ):
+        """ Returns the most likely strides, according to the peaks of the
+            autocorrelation of the byte values in the region, as stride
+            candidates, best first. (Requires NumPy.)
+
+            The region is correlated in overlapping windows, so that small
+            tables are not drowned out by the rest of the region. Within
+            a window, only the highest peak among nearby lags is kept, and
+            peaks at multiples of a lag, which correlates at least half
+            as well, are dropped as harmonics of that lag. The score of
+            a candidate is the sum of its normalized autocorrelation over
+            the windows, in which it peaks. """
+
+        if None is _numpy:
+            raise ImportError(
+                "NumPy is required for autocorrelation of program images."
+            )
+        if None is maximum_stride: maximum_stride = self._MAXIMUM_STRIDE
+        MINIMUM_STRIDE = self._MINIMUM_STRIDE
+        peak_radius = self._peak_radius
+
+        values = _numpy.frombuffer(
+            self._program_image, dtype = _numpy.uint8,
+            count = self._stop - self._start, offset = self._start
+        ).astype( _numpy.float64 )
+        maximum_stride = min( maximum_stride, len( values ) - 2 )
+        if MINIMUM_STRIDE > maximum_stride: return [ ]
+        window_size = min(
+            len( values ), self._WINDOW_STRIDES_COUNT * maximum_stride
+        )
+        # Note: Zero padding to twice the length avoids circular correlation.
+        fft_size = 1 << ( 2 * window_size - 1 ).bit_length( )
+        lags = _numpy.arange( MINIMUM_STRIDE, maximum_stride + 1 )
+        scores = { }
+        for window_start in range(
+            0, len( values ) - window_size + 1, window_size // 2
+        ):
+            window = values[ window_start : window_start + window_size ]
+            window = window - window.mean( )
+            spectrum = _numpy.fft.rfft( window, fft_size )
+            correlation = _numpy.fft.irfft(
+                spectrum * _numpy.conj( spectrum ), fft_size
+            )[ : maximum_stride + 2 ]
+            if 0 >= correlation[ 0 ]: continue
+            # Normalize by the number of overlapping bytes at each lag.
+            correlation /= window_size - _numpy.arange( len( correlation ) )
+            correlation /= correlation[ 0 ]
+            for lag in lags[
+                ( correlation[ lags ] > correlation[ lags - 1 ] )
+                & ( correlation[ lags ] >= correlation[ lags + 1 ] )
+                & ( 0 < correlation[ lags ] )
+            ]:
+                lag = int( lag )
+                score = correlation[ lag ]
+                radius = peak_radius( lag )
+                if score < correlation[
+                    max( 1, lag - radius ) : lag + radius + 1
+                ].max( ): continue
+                if any(
+                    score <= 2 * correlation[
+                        round( lag / order ) - 1 : round( lag / order ) + 2
+                    ].max( )
+                    for order in range( 2, min(
+                        self._HARMONICS_COUNT, lag // MINIMUM_STRIDE
+                    ) + 1 )
+                ): continue
+                scores[ lag ] = scores.get( lag, 0.0 ) + float( score )
+
+        # Keep only the best of nearby peaks from different windows and
+        # drop the remaining multiples of better strides.
+        candidates = [ ]
+        for lag, score in sorted(
+            scores.items( ), key = lambda item: ( -item[ 1 ], item[ 0 ] )
+        ):
+            radius = peak_radius( lag )
+            if any(
+                score < scores.get( other_lag, 0.0 )
+                for other_lag in range( lag - radius, lag + radius + 1 )
+            ): continue
+            if any(
+                1 >= min(
+                    lag % candidate.stride,
+                    candidate.stride - lag % candidate.stride
+                )
+                for candidate in candidates if lag > candidate.stride
+            ): continue
+            candidates.append( StrideCandidate( lag, score ) )
+            if limit <= len( candidates ): break
+
+        return candidates
+
+
+    def find_tables( self, strides, minimum_records_count = None ):
+        """ Returns candidate tables at any of the given strides,
+            ordered by base offset.
+
+            A candidate table is the longest run of names at the stride.
+            Runs of other names in the same records, such as epithets,
+            are merged into it. The names of a run, which ends with a record
+            named "end", are taken to start the records; the terminating
+            record is not counted. Runs are extended backwards over names,
+            which follow printable characters. """
+
+        if None is minimum_records_count:
+            minimum_records_count = self._MINIMUM_RECORDS_COUNT
+
+        name_offsets = self.name_offsets
+        name_offsets_set = frozenset( name_offsets )
+        tables = [ ]
+        for stride in sorted( frozenset( strides ) ):
+            visited = set( )
+            runs = [ ]
+            for offset in name_offsets:
+                if offset in visited: continue
+                stop_offset = offset
+                while stop_offset in name_offsets_set:
+                    visited.add( stop_offset )
+                    stop_offset += stride
+                if minimum_records_count > ( stop_offset - offset ) // stride:
+                    continue
+                runs.append( ( offset, stop_offset ) )
+            for group in self._group_runs( runs, stride ):
+                table = self._table_from_runs( group, stride )
+                if minimum_records_count > table.records_count: continue
+                tables.append( table )
+
+        return sorted( tables )
+
+
+    @staticmethod
+    def _group_runs( runs, stride ):
+        """ Groups runs of names, which overlap within the same records. """
+
+        groups = [ ]
+        group_stop_offset = None
+        for offset, stop_offset in sorted( runs ):
+            if groups and offset < group_stop_offset:
+                groups[ -1 ].append( ( offset, stop_offset ) )
+                group_stop_offset = max( group_stop_offset, stop_offset )
+                continue
+            groups.append( [ ( offset, stop_offset ) ] )
+            group_stop_offset = stop_offset
+
+        return groups
+
+
+    def _table_from_runs( self, runs, stride ):
+        """ Returns the candidate table spanned by a group of runs of names
+            at a stride. """
+
+        program_image = self._program_image
+
+        terminated = False
+        primary_offset = runs[ 0 ][ 0 ]
+        for offset, stop_offset in runs:
+            if b"end\0" == program_image[
+                stop_offset - stride : stop_offset - stride + 4
+            ]:
+                terminated = True
+                primary_offset = offset
+                break
+
+        base_offset, stop_offset = None, None
+        for offset, run_stop_offset in runs:
+            shift = ( offset - primary_offset ) % stride
+            if None is base_offset or base_offset > offset - shift:
+                base_offset = offset - shift
+            if None is stop_offset or stop_offset < run_stop_offset - shift:
+                stop_offset = run_stop_offset - shift
+        if terminated: stop_offset -= stride
+
+        while self._start <= base_offset - stride \
+        and self._RE_NAME.match( program_image, base_offset - stride ):
+            base_offset -= stride
+
+        return TableCandidate(
+            base_offset, stride, ( stop_offset - base_offset ) // stride,
+            terminated
+        )
+
+
+    @staticmethod
+    def _peak_radius( lag ):
+        """ Distance from a lag, within which lower peaks of the
+            autocorrelation are taken to be side lobes of its peak. """
+
+        return max( 4, lag // 16 )
+
+
+    def _choose_strides( self, scored_strides, limit ):
+        """ Returns the best scored strides as stride candidates.
+            Strides, which are multiples of strides with at least half
+            of their score, are dropped, as they are harmonics
+            of the same tables rather than tables of their own. """
+
+        MINIMUM_STRIDE = self._MINIMUM_STRIDE
+
+        scores = dict( scored_strides )
+        candidates = [ ]
+        for stride, score in sorted(
+            scores.items( ), key = lambda item: ( -item[ 1 ], item[ 0 ] )
+        ):
+            if any(
+                score <= 2 * scores.get( stride // factor, 0 )
+                for factor in range( 2, stride // MINIMUM_STRIDE + 1 )
+                if 0 == stride % factor
+            ): continue
+            candidates.append( StrideCandidate( stride, score ) )
+            if limit <= len( candidates ): break
+
+        return candidates
+
+
+class DominionsVersionsCache( object ):
+    """ Small on-disk cache of the Dominions versions of executables.
+
+        Entries are keyed by the absolute path of an executable. An entry is
+        trusted without reading the executable, while the size and
+        modification time of the file are unchanged. Otherwise, the content
+        digest of the executable is looked up among all entries, so that
+        copies of known executables need no detection either. """
+
+
+    _FILE_NAME      = "versions.json"
+    _ENTRIES_LIMIT  = 256
+
+
+    def __init__( self, file_path = None ):
+
+        if None is file_path:
+            try:
+                file_path = _path_join(
+                    _cache_directory_path( ), self._FILE_NAME
+                )
+            # Note: Without a cache directory, nothing is ever cached.
+            except ( IOError, OSError ): file_path = _os.devnull
+        self._file_path     = file_path
+        self._entries       = None
+
+
+    @property
+    def file_path( self ):
+        """ Path to the file which holds the cache. """
+
+        return self._file_path
+
+
+    def find_dominions_version( self, program_path, program_image = None ):
+        """ Returns the Dominions version of an executable,
+            detecting and caching it, if necessary. """
+
+        entries     = self._load( )
+        key         = _path_absolute( program_path )
+        stat        = _os.stat( program_path )
+        size, mtime = stat.st_size, stat.st_mtime_ns
+
+        entry = entries.get( key )
+        if entry and size == entry[ "size" ] and mtime == entry[ "mtime" ]:
+            return _DominionsVersion( entry[ "platform" ], entry[ "version" ] )
+
+        if None is program_image:
+            with open( program_path, "rb" ) as program_file:
+                with _mmap.mmap(
+                    program_file.fileno( ), 0, prot = _mmap.PROT_READ
+                ) as program_image:
+                    return self.find_dominions_version(
+                        program_path, program_image
+                    )
+
+        digest = program_image_digest( program_image )
+        for entry in entries.values( ):
+            if digest == entry[ "digest" ]:
+                dominions_version = _DominionsVersion(
+                    entry[ "platform" ], entry[ "version" ]
+                )
+                break
+        else:
+            dominions_version = ProgramImageSurvey.from_program_image(
+                program_image, digest
+            ).dominions_version
+
+        entries.pop( key, None )
+        entries[ key ] = {
+            "size": size, "mtime": mtime, "digest": digest,
+            "platform": dominions_version.platform,
+            "version": dominions_version.version,
+        }
+        while self._ENTRIES_LIMIT < len( entries ):
+            entries.popitem( last = False )
+        self._save( )
+
+        return dominions_version
+
+
+    def _load( self ):
+        """ Loads the entries of the cache, if not already loaded.
+            A missing or unreadable cache file yields an empty cache. """
+
+        if None is self._entries:
+            try:
+                with open( self._file_path, "r" ) as cache_file:
+                    self._entries = _json.load(
+                        cache_file, object_pairs_hook = _OrderedDict
+                    )
+            except ( IOError, OSError, ValueError ):
+                self._entries = _OrderedDict( )
+
+        return self._entries
+
+
+    def _save( self ):
+        """ Saves the entries of the cache, replacing the cache file at once.
+            Failures are ignored, since the cache is a mere shortcut. """
+
+        temporary_path = "{0}.{1}".format( self._file_path, _os.getpid( ) )
+        try:
+            with open( temporary_path, "w" ) as cache_file:
+                _json.dump( self._entries, cache_file )
+            _os.replace( temporary_path, self._file_path )
+        except ( IOError, OSError ): pass
+
+
+###############################################################################
+# vim: set ft=python ts=4 sts=4 sw=4 et tw=79:                                #
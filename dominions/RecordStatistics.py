@@ -0,0 +1,326 @@
+###############################################################################
+#                                dominions                                    #
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+""" Statistics of the fields of the records of program image tables,
+    as an aid to reverse-engineering their layouts. """
+
+
+__docformat__ = "reStructuredText"
+
+
+from collections import (
+    namedtuple              as _namedtuple,
+)
+
+try:
+    import numpy        as _numpy
+except ImportError:
+    _numpy = None
+
+from dominions.utils import (
+    PrettyFormatConfig      as _PrettyFormatConfig,
+)
+
+
+UnknownFieldStatistics = _namedtuple(
+    "UnknownFieldStatistics",
+    "offset size distinct_count minimum maximum zero_ratio entropy "
+    "correlated_field_name correlation"
+)
+
+
+class RecordStatistics( object ):
+    """ Statistics of the unknown fields of all records of a table,
+        along with a map of the bytes of a record, which the decoder consumes.
+
+        The statistics of every unknown field are computed at once over
+        the columns of a structured array of the records: the number
+        of distinct values, the least and greatest values, the ratio
+        of zero values, the entropy of the values in bits, and the known
+        field, with which the values correlate most strongly.
+
+        The coverage map has one code per byte of a record: ``K`` for bytes
+        of known fields, ``U`` for bytes of unknown fields, ``.`` for skipped
+        bytes, and ``!`` for skipped bytes, which are not zero in every
+        record. (Requires NumPy.) """
+
+
+    _COVERAGE_KNOWN         = "K"
+    _COVERAGE_UNKNOWN       = "U"
+    _COVERAGE_SKIPPED       = "."
+    _COVERAGE_SKIPPED_DATA  = "!"
+    _COVERAGE_LINE_WIDTH    = 32
+
+
+    @classmethod
+    def from_program_image(
+        cls, table_type, program_image, dominions_version
+    ):
+        """ Computes the statistics of the records of a table
+            within a program image. """
+
+        return cls(
+            table_type.ROW_CLASS( ).PROGRAM_IMAGE_RECORD_LAYOUT(
+                dominions_version
+            ),
+            table_type.records_from_program_image(
+                program_image, dominions_version
+            ),
+            title = table_type.TITLE( )
+        )
+
+
+    def __init__( self, layout, records, title = None ):
+
+        if None is _numpy:
+            raise ImportError(
+                "NumPy is required for statistics of records."
+            )
+        if not len( records ):
+            raise ValueError( "No records to compute statistics of." )
+
+        self._title         = title
+        self._records_count = len( records )
+        self._coverage      = self._coverage_from_records( layout, records )
+        self._unknowns      = self._unknowns_statistics_from_records(
+            layout, records
+        )
+
+
+    @property
+    def title( self ):
+        """ Title of the table of the records. """
+
+        return self._title
+
+
+    @property
+    def records_count( self ):
+        """ Number of records, over which the statistics are computed. """
+
+        return self._records_count
+
+
+    @property
+    def coverage( self ):
+        """ Coverage map, as a string with one code per byte of a record. """
+
+        return self._coverage
+
+
+    @property
+    def unknowns( self ):
+        """ List of statistics of the unknown fields, in order of offset. """
+
+        return self._unknowns
+
+
+    def _coverage_from_records( self, layout, records ):
+        """ Returns the coverage map of the bytes of the records. """
+
+        coverage = [ self._COVERAGE_SKIPPED ] * layout.size
+        for name in layout.field_names:
+            offset = layout.field_offset( name )
+            coverage[ offset : offset + layout.field_size( name ) ] \
+            = self._COVERAGE_KNOWN * layout.field_size( name )
+        for offset, column in layout.unknown_columns_from_records(
+            records
+        ).items( ):
+            size = column.dtype.itemsize
+            coverage[ offset : offset + size ] = self._COVERAGE_UNKNOWN * size
+
+        # Note: Records, which are viewed contiguously, can be viewed as rows
+        #       of bytes, so that every byte offset is checked at once.
+        raw = _numpy.frombuffer(
+            _numpy.ascontiguousarray( records ).data, dtype = _numpy.uint8
+        ).reshape( len( records ), layout.size )
+        for offset in _numpy.flatnonzero( raw.any( axis = 0 ) ).tolist( ):
+            if self._COVERAGE_SKIPPED == coverage[ offset ]:
+                coverage[ offset ] = self._COVERAGE_SKIPPED_DATA
+
+        return "".join( coverage )
+
+
+    def _unknowns_statistics_from_records( self, layout, records ):
+        """ Returns a list of statistics of the unknown fields
+            of the records, in order of offset. """
+
+        unknown_columns = [
+            ( offset, column ) for offset, column
+            in layout.unknown_columns_from_records( records ).items( )
+            if column.dtype.kind in "iu"
+        ]
+        if not unknown_columns: return [ ]
+        offsets = [ offset for offset, __ in unknown_columns ]
+        sizes = [ column.dtype.itemsize for __, column in unknown_columns ]
+        # Note: Unsigned 64-bit values wrap around, which keeps them distinct.
+        values = _numpy.column_stack( [
+            column.astype( _numpy.int64 ) for __, column in unknown_columns
+        ] )
+        records_count, columns_count = values.shape
+
+        minima = values.min( axis = 0 )
+        maxima = values.max( axis = 0 )
+        zero_ratios = ( 0 == values ).mean( axis = 0 )
+
+        # Runs of equal values in each sorted column are the distinct values.
+        # Every run starts at a change of value or at the start of a column.
+        sorted_values = _numpy.sort( values, axis = 0 )
+        run_starts = _numpy.ones(
+            ( columns_count, records_count + 1 ), dtype = bool
+        )
+        run_starts[ :, 1 : records_count ] \
+        = ( sorted_values[ 1 : ] != sorted_values[ : -1 ] ).T
+        distinct_counts = run_starts[ :, : records_count ].sum( axis = 1 )
+        starts = _numpy.flatnonzero( run_starts )
+        # Note: Each column ends with a sentinel start,
+        #       which does not start a run of its own.
+        is_run = records_count != starts[ : -1 ] % ( records_count + 1 )
+        probabilities \
+        = _numpy.diff( starts )[ is_run ] / float( records_count )
+        entropies = _numpy.bincount(
+            starts[ : -1 ][ is_run ] // ( records_count + 1 ),
+            weights = -probabilities * _numpy.log2( probabilities ),
+            minlength = columns_count
+        )
+
+        correlated_names, correlations = self._correlations_with_known_fields(
+            layout, records, values
+        )
+
+        return [
+            UnknownFieldStatistics(
+                offsets[ i ], sizes[ i ], int( distinct_counts[ i ] ),
+                int( minima[ i ] ), int( maxima[ i ] ),
+                float( zero_ratios[ i ] ), float( entropies[ i ] ),
+                correlated_names[ i ], correlations[ i ]
+            )
+            for i in range( columns_count )
+        ]
+
+
+    @staticmethod
+    def _correlations_with_known_fields( layout, records, values ):
+        """ Returns the names of the known fields, with which each column
+            of values correlates most strongly, and the correlations.
+            Elements of known fields with repeat counts are named by index.
+            Columns, which are constant, correlate with nothing. """
+
+        names = [ ]
+        known_columns = [ ]
+        for name in layout.field_names:
+            column = records[ name ]
+            if column.dtype.base.kind not in "iu": continue
+            if 1 == column.ndim:
+                names.append( name )
+                known_columns.append( column )
+                continue
+            for index in range( column.shape[ 1 ] ):
+                names.append( "{0}[{1}]".format( name, index ) )
+                known_columns.append( column[ :, index ] )
+
+        columns_count = values.shape[ 1 ]
+        if not known_columns:
+            return [ None ] * columns_count, [ None ] * columns_count
+
+        standardized = RecordStatistics._standardized
+        correlations = standardized( values ).T.dot(
+            standardized( _numpy.column_stack( known_columns ) )
+        ) / len( values )
+        best_indices = _numpy.abs( correlations ).argmax( axis = 1 )
+
+        correlated_names = [ ]
+        best_correlations = [ ]
+        for i, best_index in enumerate( best_indices.tolist( ) ):
+            correlation = float( correlations[ i, best_index ] )
+            if 0 == correlation:
+                correlated_names.append( None )
+                best_correlations.append( None )
+            else:
+                correlated_names.append( names[ best_index ] )
+                best_correlations.append( correlation )
+
+        return correlated_names, best_correlations
+
+
+    @staticmethod
+    def _standardized( matrix ):
+        """ Returns the columns of a matrix with zero mean and unit variance.
+            Constant columns become zero. """
+
+        matrix = matrix.astype( _numpy.float64 )
+        matrix -= matrix.mean( axis = 0 )
+        deviations = _numpy.sqrt( ( matrix * matrix ).mean( axis = 0 ) )
+        deviations[ 0 == deviations ] = _numpy.inf
+
+        return matrix / deviations
+
+
+    def pformat( self, pformat_config = _PrettyFormatConfig( ) ):
+        """ Nicely formats the statistics for display. """
+
+        indent = pformat_config.indent
+        LINE_WIDTH = self._COVERAGE_LINE_WIDTH
+
+        lines = [ ]
+        if pformat_config.render_title and self._title:
+            lines.append( "{0}{1} ({2} records)".format(
+                indent, self._title, self._records_count
+            ) )
+        lines.append( "{0}Coverage ({1}):".format(
+            indent, ", ".join( [
+                "{0}: known".format( self._COVERAGE_KNOWN ),
+                "{0}: unknown".format( self._COVERAGE_UNKNOWN ),
+                "{0}: skipped".format( self._COVERAGE_SKIPPED ),
+                "{0}: skipped non-zero".format( self._COVERAGE_SKIPPED_DATA ),
+            ] )
+        ) )
+        for offset in range( 0, len( self._coverage ), LINE_WIDTH ):
+            lines.append( "{0}{1:6d}  {2}".format(
+                indent, offset, self._coverage[ offset : offset + LINE_WIDTH ]
+            ) )
+        if not self._unknowns: return "\n".join( lines )
+
+        lines.append( "{0}Unknown fields:".format( indent ) )
+        lines.append(
+            "{0}{1:>6} {2:>4} {3:>8} {4:>20} {5:>20} {6:>6} {7:>7}  {8}"
+            .format(
+                indent, "offset", "size", "distinct", "minimum", "maximum",
+                "zero%", "entropy", "correlated field"
+            )
+        )
+        for unknown in self._unknowns:
+            if None is unknown.correlated_field_name: correlated = "-"
+            else:
+                correlated = "{0} ({1:+.3f})".format(
+                    unknown.correlated_field_name, unknown.correlation
+                )
+            lines.append(
+                "{0}{1:6d} {2:4d} {3:8d} {4:20d} {5:20d} {6:6.1f} {7:7.3f}  "
+                "{8}".format(
+                    indent, unknown.offset, unknown.size,
+                    unknown.distinct_count, unknown.minimum, unknown.maximum,
+                    100 * unknown.zero_ratio, unknown.entropy, correlated
+                )
+            )
+
+        return "\n".join( lines )
+
+
+###############################################################################
+# vim: set ft=python ts=4 sts=4 sw=4 et tw=79:                                #
@@ -22,14 +22,15 @@
 __docformat__ = "reStructuredText"
 
 
-from collections import (
-    OrderedDict                 as _OrderedDict,
-)
-
 from textwrap import (
     TextWrapper                 as _TextWrapper,
 )
 
+try:
+    import numpy            as _numpy
+except ImportError:
+    _numpy = None
+
 from sqlalchemy import (
     Column                      as _SQLA_Column,
     ForeignKey                  as _SQLA_ForeignKey,
@@ -44,13 +45,7 @@ from sqlalchemy.orm import (
 )
 
 from dominions.utils import (
-    from_native_uint8       as _from_native_uint8,
-    from_native_int8        as _from_native_int8,
-    from_native_uint16      as _from_native_uint16,
-    from_native_int16       as _from_native_int16,
-    from_native_uint32      as _from_native_uint32,
-    from_native_int64       as _from_native_int64,
-    from_string             as _from_string,
+    RecordLayout            as _RecordLayout,
     PLATFORM_LINUX          as _PLATFORM_LINUX,
     PLATFORM_MACOSX         as _PLATFORM_MACOSX,
     PLATFORM_WINDOWS        as _PLATFORM_WINDOWS,
@@ -131,116 +126,119 @@ class Spell( _DataTableRow_NamedInteger, _DataTableRow_ProgramImage ):
     unknown_fields          = _SQLA_relationship( "SpellUnknownField" )
 
 
-    _TITLE                      = "Spell"
-    _PROGRAM_IMAGE_RECORD_SIZES = {
-        "4.03": 200, "4.04": 200,
+    _TITLE                          = "Spell"
+    _PROGRAM_IMAGE_RECORD_LAYOUT_4_03   = _RecordLayout( [
+        ( "name",                       "36s" ),
+        ( "school",                     "b" ),
+        ( "research_level",             "B" ),
+        ( "path_mask",                  "h" ),
+        ( "path_level_mask",            "H" ),
+        ( "fatigue",                    "H" ),
+        ( "raw_area",                   "H" ),
+        ( "effect_number",              "H" ),
+        ( "raw_range",                  "H" ),
+        ( "precision",                  "h" ),
+        ( None,                         "I" ),
+        ( "raw_argument",               "q" ),
+        ( "effects_count",              "H" ),
+        ( "flight_sprite_number",       "h" ),
+        ( "flight_sprite_length",       "H" ),
+        ( "explosion_sprite_number",    "h" ),
+        ( "explosion_sprite_length",    "H" ),
+        ( None,                         "I" ),
+        ( None,                         "H" ),
+        ( "modifiers_mask",             "q" ),
+        ( "next_spell",                 "H" ),
+        ( "sound_number",               "H" ),
+        ( "attribute_keys",             "13I" ),
+        ( "attribute_values",           "13I" ),
+        ( None,                         "I" ),
+    ] )
+    _PROGRAM_IMAGE_RECORD_LAYOUTS   = {
+        "4.03": _PROGRAM_IMAGE_RECORD_LAYOUT_4_03,
+        "4.04": _PROGRAM_IMAGE_RECORD_LAYOUT_4_03,
     }
 
 
     @classmethod
-    def from_program_image(
-        cls, program_image, base_offset, number, dominions_version
-    ):
-        """ Creates an instance from a program image. """
+    def decode_program_image_fields( cls, fields ):
+        """ Decodes derived fields from the raw fields of a record. """
 
-        # TODO: Version this constant.
-        NAME_LENGTH     = 36
-
-        offset = base_offset
-        
-        args = { "number": number }
-        effect_args = { }
-        unknowns = _OrderedDict( )
-        
-        args[ "name" ], __ = _from_string( program_image, offset, NAME_LENGTH )
-        if "end" == args[ "name" ]: raise StopIteration( )
-        offset += NAME_LENGTH
+        fields.update( _Effect.decode_raw_data( **{
+            name: fields[ name ] for name in _Effect.RAW_FIELD_NAMES( )
+        } ) )
 
-        args[ "school" ], offset = _from_native_int8( program_image, offset )
-        args[ "research_level" ], offset \
-        = _from_native_uint8( program_image, offset )
-
-        path_mask, offset = _from_native_int16( program_image, offset )
+        path_mask = fields[ "path_mask" ]
         if 0 > path_mask:
             if -1 == path_mask:
-                args[ "path_0" ] = -1
-                args[ "path_1" ] = -1
+                fields[ "path_0" ] = -1
+                fields[ "path_1" ] = -1
             else:
-                args[ "path_0" ] = 256 + path_mask
-                args[ "path_1" ] = -1
+                fields[ "path_0" ] = 256 + path_mask
+                fields[ "path_1" ] = -1
         else:
-            args[ "path_0" ] = 0x00ff & path_mask
-            args[ "path_1" ] = (0xff00 & path_mask) >> 8
-        path_level_mask, offset = _from_native_uint16( program_image, offset )
-        args[ "path_level_0" ] = 0x00ff & path_level_mask
-        args[ "path_level_1" ] = (0xff00 & path_level_mask) >> 8
-
-        fatigue, offset = _from_native_uint16( program_image, offset )
-        args[ "fatigue" ] = fatigue % 100
-        args[ "gem_cost" ] = fatigue // 100
-
-        effect_args[ "raw_area" ], offset \
-        = _from_native_uint16( program_image, offset )
-
-        effect_args[ "effect_number" ], offset \
-        = _from_native_uint16( program_image, offset )
-
-        effect_args[ "raw_range" ], offset \
-        = _from_native_uint16( program_image, offset )
-
-        args[ "precision" ], offset \
-        = _from_native_int16( program_image, offset )
-
-        unknowns[ offset ], offset \
-        = _from_native_uint32( program_image, offset )
+            fields[ "path_0" ] = 0x00ff & path_mask
+            fields[ "path_1" ] = (0xff00 & path_mask) >> 8
+        path_level_mask = fields[ "path_level_mask" ]
+        fields[ "path_level_0" ] = 0x00ff & path_level_mask
+        fields[ "path_level_1" ] = (0xff00 & path_level_mask) >> 8
 
-        effect_args[ "raw_argument" ], offset \
-        = _from_native_int64( program_image, offset )
+        fatigue = fields[ "fatigue" ]
+        fields[ "fatigue" ] = fatigue % 100
+        fields[ "gem_cost" ] = fatigue // 100
 
-        args[ "effects_count" ], offset \
-        = _from_native_uint16( program_image, offset )
+        return fields
 
-        effect_args[ "flight_sprite_number" ], offset \
-        = _from_native_int16( program_image, offset )
-        effect_args[ "flight_sprite_length" ], offset \
-        = _from_native_uint16( program_image, offset )
 
-        effect_args[ "explosion_sprite_number" ], offset \
-        = _from_native_int16( program_image, offset )
-        effect_args[ "explosion_sprite_length" ], offset \
-        = _from_native_uint16( program_image, offset )
-
-        unknowns[ offset ], offset \
-        = _from_native_uint32( program_image, offset )
-        unknowns[ offset ], offset \
-        = _from_native_uint16( program_image, offset )
-
-        effect_args[ "modifiers_mask" ], offset \
-        = _from_native_int64( program_image, offset )
+    @classmethod
+    def decode_program_image_columns( cls, columns ):
+        """ Decodes derived columns from the raw columns
+            of a structured array of records. """
+
+        columns.update( _Effect.decode_raw_columns( **{
+            name: columns[ name ] for name in _Effect.RAW_FIELD_NAMES( )
+        } ) )
+
+        path_mask = columns[ "path_mask" ].astype( _numpy.int64 )
+        is_single_path = 0 > path_mask
+        columns[ "path_0" ] = _numpy.where(
+            is_single_path,
+            _numpy.where( -1 == path_mask, -1, 256 + path_mask ),
+            0x00ff & path_mask
+        )
+        columns[ "path_1" ] = _numpy.where(
+            is_single_path, -1, (0xff00 & path_mask) >> 8
+        )
+        path_level_mask = columns[ "path_level_mask" ].astype( _numpy.int64 )
+        columns[ "path_level_0" ] = 0x00ff & path_level_mask
+        columns[ "path_level_1" ] = (0xff00 & path_level_mask) >> 8
 
-        args[ "next_spell" ], offset \
-        = _from_native_uint16( program_image, offset )
+        fatigue = columns[ "fatigue" ].astype( _numpy.int64 )
+        columns[ "fatigue" ] = fatigue % 100
+        columns[ "gem_cost" ] = fatigue // 100
 
-        effect_args[ "sound_number" ], offset \
-        = _from_native_uint16( program_image, offset )
+        return columns
 
-        attribute_keys = [ ]
-        for i in range( 13 ):
-            attribute_key, offset \
-            = _from_native_uint32( program_image, offset )
-            attribute_keys.append( attribute_key )
 
-        attribute_values = [ ]
-        for i in range( 13 ):
-            attribute_value, offset \
-            = _from_native_uint32( program_image, offset )
-            attribute_values.append( attribute_value )
+    @classmethod
+    def from_program_image_fields(
+        cls, fields, unknowns, base_offset, number, dominions_version
+    ):
+        """ Creates an instance from the decoded fields of a record. """
 
-        unknowns[ offset ], offset \
-        = _from_native_uint32( program_image, offset )
+        args = { "number": number }
+        for name in [
+            "name", "school", "research_level",
+            "path_0", "path_level_0", "path_1", "path_level_1",
+            "precision", "fatigue", "gem_cost",
+            "effects_count", "next_spell",
+        ]:
+            args[ name ] = fields[ name ]
 
         attributes = [ ]
-        for key, value in zip( attribute_keys, attribute_values ):
+        for key, value in zip(
+            fields[ "attribute_keys" ], fields[ "attribute_values" ]
+        ):
             if not key: continue
             attributes.append( _SpellAttribute.from_raw_data(
                 spell_number = number,
@@ -249,20 +247,32 @@ class Spell( _DataTableRow_NamedInteger, _DataTableRow_ProgramImage ):
             ) )
         args[ "attributes" ] = attributes
 
+        # Note: Unknown fields are keyed by offset within the program image.
         args[ "unknown_fields" ] = [
             SpellUnknownField(
                 spell_number = number,
-                offset = offset, value = value
+                offset = base_offset + offset, value = value
             )
             for offset, value in unknowns.items( ) if value
         ]
 
-        effect_args[ "object_type" ] = cls.TITLE( )
-        args[ "effect" ] = _Effect.from_raw_data( **effect_args )
+        args[ "effect" ] = _Effect.from_decoded_data( cls.TITLE( ), **{
+            name: fields[ name ] for name in _Effect.DECODED_FIELD_NAMES( )
+        } )
 
         return cls( **args )
 
 
+    def rebase_program_image_offsets( self, offset_delta ):
+        """ Shifts the offsets of the unknown fields within the program image.
+            Returns whether any offset was shifted. """
+
+        for unknown_field in self.unknown_fields:
+            unknown_field.offset += offset_delta
+
+        return bool( self.unknown_fields )
+
+
     def pformat_row( self,
         tables, pformat_config = _PrettyFormatConfig( )
     ):
@@ -483,188 +493,10 @@ class Spells_DataTable( _DataTable_NamedInteger, _DataTable_ProgramImage ):
             "4.03": 0x6BBAE0, "4.04": 0x8A7560,
         }
     }
-    _PROGRAM_IMAGE_BASE_OFFSETS_DESCRIPTIONS_INDEX = {
-        _PLATFORM_LINUX( ): {
-            "4.03": 0x2D2316, "4.04": 0x348FB3,
-        }
-    }
-    _PROGRAM_IMAGE_BASE_OFFSETS_DESCRIPTIONS = {
-        _PLATFORM_LINUX( ): {
-            "4.03": 0x2DF8D0, "4.04": 0x34EDE8,
-        }
-    }
-
-
-    def postprocess_extracted_table( self, program_image, dominions_version ):
-        """ Performs post-processing on an extracted table. """
-
-        # TEMP HACK: Disable until a proper lookup table is found.
-        return
-
-        DEBUG           = False
-
-        # TODO: Version this constant.
-        NAME_LENGTH     = 36
-        # UGLY HACK
-        DUPLICATES = {
-            "Natural Rain": "Rain",
-            "Summon Great Eagles": "Summon Great Eagle",
-            "Revive Bishop": "Revive Arch Bishop",
-            "Revive Acolyte": "Revive Arch Bishop",
-            "Revive Dusk Elder": "Revive Spectator",
-            "Improved Cross Breeding": "Cross Breeding",
-            "Wrath of the Sepulchre": "Unholy Wrath",
-            "Protection of the Sepulchre": "Protection of the Grave",
-            "Royal Protection": "Protection of the Grave",
-            "Call Sirrush": "Contact Sirrush",
-            "Contact Cu Sidhe": "Summon Cu Sidhe",
-            "Contact Scorpion Man": "Summon Scorpion Man",
-            "Summon Rakshasa Warriors": "Summon Rakshasas",
-        }
-        UNDESCRIBED = set( [
-            "Contact Forest Giant",
-            "Bind Beast Bat",
-            "Revive Lemur Consul",
-            "Revive Lemur Acolyte",
-        ] )
-        NEXT_INDICES_MISSING = {
-            "Fire Flies": 1,
-            "King of Elemental Fire": 1,
-            "Charge Body": 2,
-            "Corpse Man Construction": 1,
-            "Clockwork Soldiers": 1,
-            "Mechanical Men": 2,
-            "Carrion Woods": 3,
-            "Bind Beast Bats": 1,
-            "Polymorph": 1,
-            "Revive Lemur Senator": 1,
-            "Spirit Curse": 1,
-            "Call Wraith Lord": 1,
-            "Ghost Riders": 1,
-        }
-
-        # TODO: Setup some proper logging.
-        if DEBUG:
-            debug_file = open( "TEMP-DEBUG.txt", "w" )
-
-        name_descr_pairs    = { }
-        spell_names         = set( )
-        for spell in self._table.values( ):
-            spell_names.add( spell.name )
-
-        descr_idx_offset    = type( self )._find_table_base_offset(
-            program_image, dominions_version,
-            "_PROGRAM_IMAGE_BASE_OFFSETS_DESCRIPTIONS_INDEX"
-        )
-        descrs_offset       = type( self )._find_table_base_offset(
-            program_image, dominions_version,
-            "_PROGRAM_IMAGE_BASE_OFFSETS_DESCRIPTIONS"
-        )
-
-        # TEMP HACK
-        descrs_offset_base = descrs_offset
-        for number in range( 900 ):
-            description, descrs_offset \
-            = self._parse_spell_description_from_program_image(
-                program_image, descrs_offset
-            )
-            if DEBUG:
-                print( "{number} (Offset: {offset})\n--\n{descr}\n".format(
-                    number = number,
-                    offset = descrs_offset - descrs_offset_base,
-                    descr = description
-                ), file = debug_file )
-        if DEBUG:
-            debug_file.close( )
-        return
-
-        descr_count         = 1
-        # The number of entries in the descriptions index does not match the
-        # number of tabulated spells, all or non-hidden. Hence, an upper bound
-        # on the scan is needed in case the termination condition is not met.
-        # TODO: Use a versioned constant for the upper bound of the index scan.
-        for number in range( 1100 ):
-
-            name, __ \
-            = _from_string( program_image, descr_idx_offset, NAME_LENGTH )
-            if "no description available" == name: break
-            descr_idx_offset += len( name ) + 1
-            if name and ":" == name[ 0 ]:
-                name = name[ 1 : ]
-            if name not in spell_names:
-                pass
-            # UGLY HACK
-            if name in DUPLICATES:
-                name_descr_pairs[ name ] \
-                = name_descr_pairs[ DUPLICATES[ name ] ] 
-                continue
-            if name in UNDESCRIBED:
-                continue
-
-            while descr_count:
-                description, descrs_offset \
-                = self._parse_spell_description_from_program_image(
-                    program_image, descrs_offset
-                )
-                descr_count -= 1
-
-            if name in NEXT_INDICES_MISSING:
-                descr_count += NEXT_INDICES_MISSING[ name ]
-            descr_count += 1
-
-            while description and ":" == description[ 0 ]:
-                name_inline = description[ 1 : ]
-                # TODO? Validate inline name.
-                description, descrs_offset \
-                = self._parse_spell_description_from_program_image(
-                    program_image, descrs_offset
-                )
-                name_descr_pairs[ name_inline ] = description
-
-                if DEBUG:
-                    print( "{name}\n--\n{descr}\n".format(
-                        name = name_inline, descr = description
-                    ), file = debug_file )
-
-                description, descrs_offset \
-                = self._parse_spell_description_from_program_image(
-                    program_image, descrs_offset
-                )
-
-            name_descr_pairs[ name ] = description
-
-            if DEBUG:
-                print( "{name}\n--\n{descr}\n".format(
-                    name = name, descr = description
-                ), file = debug_file )
-
-        for number, spell in self._table.items( ):
-            description = name_descr_pairs.get( spell.name )
-            if description:
-                spell.description = description
-
-        if DEBUG:
-            debug_file.close( )
-
-
-    def _parse_spell_description_from_program_image( self,
-        program_image, offset
-    ):
-        """ Parses a spell description from program image. """
-
-        CHUNK_SIZE      = 8
 
-        description = ""
-        while True:
-            chunk, __ = _from_string( program_image, offset, CHUNK_SIZE )
-            description += chunk
-            offset += CHUNK_SIZE
-            if CHUNK_SIZE != len( chunk ):
-                if not chunk and 0 != len( description ) % CHUNK_SIZE:
-                    print( description )
-                break
 
-        return description, offset
+    # TODO: Extract the descriptions of spells, once the pairing of the names
+    #       in the descriptions index with the descriptions is known.
 
 
 ###############################################################################
@@ -22,9 +22,10 @@
 __docformat__ = "reStructuredText"
 
 
-from collections import (
-    OrderedDict                 as _OrderedDict,
-)
+try:
+    import numpy            as _numpy
+except ImportError:
+    _numpy = None
 
 from sqlalchemy import (
     Column                      as _SQLA_Column,
@@ -41,11 +42,7 @@ from sqlalchemy.orm import (
 
 
 from dominions.utils import (
-    from_native_uint16      as _from_native_uint16,
-    from_native_int16       as _from_native_int16,
-    from_native_uint32      as _from_native_uint32,
-    from_native_int64       as _from_native_int64,
-    from_string             as _from_string,
+    RecordLayout            as _RecordLayout,
     PLATFORM_LINUX          as _PLATFORM_LINUX,
     PLATFORM_MACOSX         as _PLATFORM_MACOSX,
     PLATFORM_WINDOWS        as _PLATFORM_WINDOWS,
@@ -107,92 +104,85 @@ class Weapon( _DataTableRow_NamedInteger, _DataTableRow_ProgramImage ):
     unknown_fields          = _SQLA_relationship( "WeaponUnknownField" )
 
 
-    _TITLE                      = "Weapon"
-    _PROGRAM_IMAGE_RECORD_SIZES = {
-        "4.03": 112, "4.04": 112,
+    _TITLE                          = "Weapon"
+    _PROGRAM_IMAGE_RECORD_LAYOUT_4_03   = _RecordLayout( [
+        ( "name",                       "36s" ),
+        ( None,                         "I" ),
+        ( "raw_argument",               "q" ),
+        ( "attack",                     "h" ),
+        ( "defense",                    "h" ),
+        ( "effect_number",              "H" ),
+        ( "length",                     "H" ),
+        ( "raw_range",                  "h" ),
+        ( "attack_rate",                "h" ),
+        ( "attacks_total",              "H" ),
+        ( None,                         "H" ),
+        ( "modifiers_mask",             "q" ),
+        ( "secondary_effect",           "h" ),
+        ( "flight_sprite_number",       "h" ),
+        ( "flight_sprite_length",       "H" ),
+        ( "explosion_sprite_number",    "h" ),
+        ( "explosion_sprite_length",    "H" ),
+        ( "raw_area",                   "H" ),
+        ( "sound_number",               "H" ),
+        ( "resource_cost",              "H" ),
+        ( "attribute_keys",             "3I" ),
+        ( "attribute_values",           "3I" ),
+    ] )
+    _PROGRAM_IMAGE_RECORD_LAYOUTS   = {
+        "4.03": _PROGRAM_IMAGE_RECORD_LAYOUT_4_03,
+        "4.04": _PROGRAM_IMAGE_RECORD_LAYOUT_4_03,
     }
 
 
     @classmethod
-    def from_program_image(
-        cls, program_image, base_offset, number, dominions_version
-    ):
-        """ Creates an instance from a program image. """
-
-        # TODO: Version this constant.
-        NAME_LENGTH     = 36
-
-        offset = base_offset
-        
-        unknowns = _OrderedDict( )
-        
-        name, __ = _from_string( program_image, offset, NAME_LENGTH )
-        if "end" == name: raise StopIteration( )
-        offset += NAME_LENGTH
-
-        unknowns[ offset ], offset \
-        = _from_native_uint32( program_image, offset )
-
-        effect_argument, offset \
-        = _from_native_int64( program_image, offset )
-
-        attack, offset = _from_native_int16( program_image, offset )
-
-        defense, offset = _from_native_int16( program_image, offset )
-
-        effect_number, offset = _from_native_uint16( program_image, offset )
-
-        length, offset = _from_native_uint16( program_image, offset )
-
-        range_of_effect, offset = _from_native_int16( program_image, offset )
+    def decode_program_image_fields( cls, fields ):
+        """ Decodes derived fields from the raw fields of a record. """
 
-        attack_rate, offset = _from_native_int16( program_image, offset )
+        fields.update( _Effect.decode_raw_data( **{
+            name: fields[ name ] for name in _Effect.RAW_FIELD_NAMES( )
+        } ) )
 
-        attacks_total, offset = _from_native_uint16( program_image, offset )
-
-        unknowns[ offset ], offset \
-        = _from_native_uint16( program_image, offset )
-
-        effect_modifiers, offset = _from_native_int64( program_image, offset )
-
-        secondary_effect, offset = _from_native_int16( program_image, offset )
+        secondary_effect = fields[ "secondary_effect" ]
         if 0 > secondary_effect:
-            secondary_effect_always = -secondary_effect
-            secondary_effect_on_hit = 0
+            fields[ "secondary_effect_always" ] = -secondary_effect
+            fields[ "secondary_effect_on_hit" ] = 0
         else:
-            secondary_effect_always = 0
-            secondary_effect_on_hit = secondary_effect
+            fields[ "secondary_effect_always" ] = 0
+            fields[ "secondary_effect_on_hit" ] = secondary_effect
 
-        flight_sprite_number, offset \
-        = _from_native_int16( program_image, offset )
-        flight_sprite_length, offset \
-        = _from_native_uint16( program_image, offset )
+        return fields
 
-        explosion_sprite_number, offset \
-        = _from_native_int16( program_image, offset )
-        explosion_sprite_length, offset \
-        = _from_native_uint16( program_image, offset )
 
-        area_of_effect, offset = _from_native_uint16( program_image, offset )
+    @classmethod
+    def decode_program_image_columns( cls, columns ):
+        """ Decodes derived columns from the raw columns
+            of a structured array of records. """
+
+        columns.update( _Effect.decode_raw_columns( **{
+            name: columns[ name ] for name in _Effect.RAW_FIELD_NAMES( )
+        } ) )
 
-        sound_number, offset = _from_native_uint16( program_image, offset )
+        secondary_effect = columns[ "secondary_effect" ].astype( _numpy.int64 )
+        is_always = 0 > secondary_effect
+        columns[ "secondary_effect_always" ] \
+        = _numpy.where( is_always, -secondary_effect, 0 )
+        columns[ "secondary_effect_on_hit" ] \
+        = _numpy.where( is_always, 0, secondary_effect )
 
-        resource_cost, offset = _from_native_uint16( program_image, offset )
+        return columns
 
-        attribute_keys = [ ]
-        for i in range( 3 ):
-            attribute_key, offset \
-            = _from_native_uint32( program_image, offset )
-            attribute_keys.append( attribute_key )
 
-        attribute_values = [ ]
-        for i in range( 3 ):
-            attribute_value, offset \
-            = _from_native_uint32( program_image, offset )
-            attribute_values.append( attribute_value )
+    @classmethod
+    def from_program_image_fields(
+        cls, fields, unknowns, base_offset, number, dominions_version
+    ):
+        """ Creates an instance from the decoded fields of a record. """
 
         attributes = [ ]
-        for key, value in zip( attribute_keys, attribute_values ):
+        for key, value in zip(
+            fields[ "attribute_keys" ], fields[ "attribute_values" ]
+        ):
             if not key: continue
             attributes.append( _WeaponAttribute.from_raw_data(
                 weapon_number = number,
@@ -200,43 +190,45 @@ class Weapon( _DataTableRow_NamedInteger, _DataTableRow_ProgramImage ):
                 raw_value = value
             ) )
 
+        # Note: Unknown fields are keyed by offset within the program image.
         unknown_fields = [
             WeaponUnknownField(
                 weapon_number = number,
-                offset = offset, value = value
+                offset = base_offset + offset, value = value
             )
             for offset, value in unknowns.items( ) if value
         ]
 
-        effect = _Effect.from_raw_data(
-            effect_number = effect_number,
-            object_type = cls.TITLE( ),
-            raw_argument = effect_argument,
-            modifiers_mask = effect_modifiers,
-            raw_range = range_of_effect,
-            raw_area = area_of_effect,
-            sound_number = sound_number,
-            flight_sprite_number = flight_sprite_number,
-            flight_sprite_length = flight_sprite_length,
-            explosion_sprite_number = explosion_sprite_number,
-            explosion_sprite_length = explosion_sprite_length
-        )
+        effect = _Effect.from_decoded_data( cls.TITLE( ), **{
+            name: fields[ name ] for name in _Effect.DECODED_FIELD_NAMES( )
+        } )
 
         return cls(
-            number = number, name = name,
+            number = number, name = fields[ "name" ],
             effect_record_id = effect.record_id,
             effect = effect,
-            attack = attack, defense = defense,
-            attack_rate = attack_rate, attacks_total = attacks_total,
-            length = length,
-            secondary_effect_on_hit = secondary_effect_on_hit,
-            secondary_effect_always = secondary_effect_always,
-            resource_cost = resource_cost,
+            attack = fields[ "attack" ], defense = fields[ "defense" ],
+            attack_rate = fields[ "attack_rate" ],
+            attacks_total = fields[ "attacks_total" ],
+            length = fields[ "length" ],
+            secondary_effect_on_hit = fields[ "secondary_effect_on_hit" ],
+            secondary_effect_always = fields[ "secondary_effect_always" ],
+            resource_cost = fields[ "resource_cost" ],
             attributes = attributes,
             unknown_fields = unknown_fields
         )
 
 
+    def rebase_program_image_offsets( self, offset_delta ):
+        """ Shifts the offsets of the unknown fields within the program image.
+            Returns whether any offset was shifted. """
+
+        for unknown_field in self.unknown_fields:
+            unknown_field.offset += offset_delta
+
+        return bool( self.unknown_fields )
+
+
     def pformat_row( self,
         tables, pformat_config = _PrettyFormatConfig( )
     ):
@@ -24,12 +24,31 @@
 __docformat__ = "reStructuredText"
 
 
+import re               as _re
 import struct           as _struct
 
+import os               as _os
+from os.path import (
+    expanduser              as _path_expand_user,
+    join                    as _path_join,
+)
+
+from sys import (
+    intern                  as _intern,
+)
+
+from collections import (
+    OrderedDict             as _OrderedDict,
+)
 from contextlib import (
     contextmanager          as _contextmanager,
 )
 
+try:
+    import numpy        as _numpy
+except ImportError:
+    _numpy = None
+
 
 def from_byte( raw_bytes, offset ):
     """ Returns a single byte from an array of bytes. """
@@ -82,20 +101,269 @@ def from_native_int64( raw_bytes, offset ):
     return _struct.unpack_from( "=q", raw_bytes, offset )[ 0 ], offset + 8
 
 
-def from_string( raw_bytes, offset, count = 0 ):
-    """ Converts a sequence of NUL-terminated bytes to a Python string. """
+def from_string(
+    raw_bytes, offset, count = 0, encoding = "latin-1", interned = False
+):
+    """ Converts a sequence of NUL-terminated bytes to a Python string.
+        If a count is given, then at most that many bytes are converted.
+        Returns the string and the number of bytes converted. """
+
+    stop = offset + count if count else len( raw_bytes )
+    try:
+        end = raw_bytes.find( b"\0", offset, stop )
+    # Note: Memory views cannot be searched directly.
+    except AttributeError:
+        end = bytes( raw_bytes[ offset : stop ] ).find( b"\0" )
+        if -1 != end: end += offset
+    if -1 == end: end = stop
+
+    with memoryview( raw_bytes ) as view:
+        s_out = str( view[ offset : end ], encoding )
+
+    if interned: s_out = intern_string( s_out )
+    return s_out, end - offset
+
+
+def intern_string( string ):
+    """ Interns a string, so that all tables can share a single copy of it.
+        Values, which are not strings, are returned unchanged. """
 
-    s_out = ""
-    i = 0
+    if isinstance( string, str ): return _intern( string )
+    return string
 
-    while True:
-        c = raw_bytes[ offset + i ]
-        if 0 == c: break
-        s_out += chr( c )
-        i += 1
-        if count and (i == count): break
 
-    return s_out, i
+def npy_header( shape, descr = "|u1" ):
+    """ Returns the header of a file in the NumPy array format,
+        which holds an array of the given shape and element type
+        in C order. The data of the array follow the header directly,
+        so that they can be written without NumPy. """
+
+    header = "{{'descr': '{0}', 'fortran_order': False, 'shape': {1}, }}"\
+    .format( descr, repr( tuple( shape ) ) )
+    # Note: The data are aligned to 64 bytes, as NumPy itself does.
+    #       The magic string, the format version, and the header length
+    #       take 10 bytes. The header ends with a newline.
+    padding = -( 10 + len( header ) + 1 ) % 64
+    header = ( header + " " * padding + "\n" ).encode( "latin-1" )
+
+    return b"\x93NUMPY\x01\x00" + _struct.pack( "<H", len( header ) ) + header
+
+
+class RecordLayout( object ):
+    """ Layout of a fixed-size record within a program image.
+
+        The layout is declared as a sequence of ``( name, format )`` pairs,
+        where the format is a native :py:mod:`struct` code with an optional
+        repeat count. It is compiled once into a single structure, so that
+        a whole record can be unpacked with one call.
+
+        * Fields with an ``s`` format are decoded as NUL-terminated strings.
+        * Fields with a repeat count are returned as tuples.
+        * Fields named ``None`` are unknown; their values are collected
+          by offset within the record.
+        * Fields with an ``x`` format are padding and are skipped.
+
+        If NumPy is available, the layout can also be viewed as a structured
+        data type, so that a whole table of records can be mapped at once. """
+
+
+    _RE_FIELD_FORMAT    = _re.compile( r"^(\d*)([xbBhHiIqQs])$" )
+    _NUMPY_TYPE_CODES   = {
+        "b": "=i1", "B": "=u1", "h": "=i2", "H": "=u2",
+        "i": "=i4", "I": "=u4", "q": "=i8", "Q": "=u8",
+    }
+
+
+    def __init__( self, fields ):
+
+        super( RecordLayout, self ).__init__( )
+
+        formats         = [ ]
+        extractors      = [ ]
+        field_offsets   = _OrderedDict( )
+        field_sizes     = { }
+        numpy_fields    = [ ]
+        numpy_unknowns  = [ ]
+        offset          = 0
+        index           = 0
+
+        for name, field_format in fields:
+
+            match = self._RE_FIELD_FORMAT.match( field_format )
+            if None is match:
+                raise ValueError( "Invalid record field format: {0}".format(
+                    field_format
+                ) )
+            count, code = match.groups( )
+            count = int( count ) if count else 1
+            size = _struct.calcsize( "=" + field_format )
+            formats.append( field_format )
+
+            if "x" == code:
+                offset += size
+                continue
+
+            if "s" == code: numpy_format = "S{0}".format( size )
+            else:           numpy_format = self._NUMPY_TYPE_CODES[ code ]
+
+            if None is name:
+                item_size = size // count if "s" != code else size
+                for i in range( 1 if "s" == code else count ):
+                    extractors.append(
+                        ( None, offset + i * item_size, index + i, None )
+                    )
+                    column_name = "unknown_{0}".format(
+                        offset + i * item_size
+                    )
+                    numpy_fields.append(
+                        ( column_name, numpy_format, offset + i * item_size )
+                    )
+                    numpy_unknowns.append(
+                        ( offset + i * item_size, column_name )
+                    )
+            else:
+                if "s" == code or 1 == count:
+                    numpy_fields.append( ( name, numpy_format, offset ) )
+                else:
+                    numpy_fields.append(
+                        ( name, ( numpy_format, ( count, ) ), offset )
+                    )
+                if "s" == code:
+                    extractors.append( ( name, "s", index, None ) )
+                elif 1 == count:
+                    extractors.append( ( name, None, index, None ) )
+                else:
+                    extractors.append( ( name, None, index, index + count ) )
+                field_offsets[ name ] = offset
+                field_sizes[ name ] = size
+
+            index += 1 if "s" == code else count
+            offset += size
+
+        self._struct            = _struct.Struct( "=" + "".join( formats ) )
+        self._extractors        = extractors
+        self._field_offsets     = field_offsets
+        self._field_sizes       = field_sizes
+        self._numpy_fields      = numpy_fields
+        self._numpy_unknowns    = numpy_unknowns
+        self._numpy_dtype       = None
+
+
+    @property
+    def size( self ):
+        """ Size of a record in bytes. """
+
+        return self._struct.size
+
+
+    @property
+    def field_names( self ):
+        """ Names of the known fields, in order of offset. """
+
+        return list( self._field_offsets.keys( ) )
+
+
+    def field_offset( self, name ):
+        """ Returns the offset of a named field within a record. """
+
+        return self._field_offsets[ name ]
+
+
+    def field_size( self, name ):
+        """ Returns the size in bytes of a named field within a record. """
+
+        return self._field_sizes[ name ]
+
+
+    def unpack_from( self, raw_bytes, offset = 0 ):
+        """ Unpacks a whole record from an array of bytes.
+            Returns a dictionary of named fields and an ordered dictionary
+            of unknown fields, keyed by offset within the record. """
+
+        values = self._struct.unpack_from( raw_bytes, offset )
+
+        fields      = { }
+        unknowns    = _OrderedDict( )
+        # Note: The kind of an unknown field is its offset within the record.
+        for name, kind, start, stop in self._extractors:
+            if   None is name:
+                unknowns[ kind ] = values[ start ]
+            elif None is not stop:
+                fields[ name ] = values[ start : stop ]
+            elif "s" == kind:
+                fields[ name ] = intern_string(
+                    values[ start ].split( b"\0", 1 )[ 0 ].decode( "latin-1" )
+                )
+            else:
+                fields[ name ] = values[ start ]
+
+        return fields, unknowns
+
+
+    @property
+    def numpy_dtype( self ):
+        """ Structured NumPy data type equivalent to the layout. """
+
+        if None is self._numpy_dtype:
+            if None is _numpy:
+                raise ImportError(
+                    "NumPy is required for structured views of records."
+                )
+            names, formats, offsets = zip( *self._numpy_fields )
+            self._numpy_dtype = _numpy.dtype( {
+                "names": list( names ), "formats": list( formats ),
+                "offsets": list( offsets ), "itemsize": self.size
+            } )
+
+        return self._numpy_dtype
+
+
+    def view_records( self, raw_bytes, offset, count ):
+        """ Returns a structured array of consecutive records,
+            which views an array of bytes without copying it. """
+
+        return _numpy.frombuffer(
+            raw_bytes, dtype = self.numpy_dtype, count = count,
+            offset = offset
+        )
+
+
+    def columns_from_records( self, records ):
+        """ Splits a structured array of records into columns.
+            Returns a dictionary of named columns and an ordered dictionary
+            of unknown columns, keyed by offset within the record. """
+
+        columns = { }
+        for name in self._field_offsets.keys( ):
+            column = records[ name ]
+            if "S" == column.dtype.kind:
+                # Clear everything after the first NUL of each string,
+                # so that only the NUL-terminated prefix remains.
+                size = column.dtype.itemsize
+                raw = _numpy.array( column ).view( _numpy.uint8 ).reshape(
+                    len( column ), size
+                )
+                raw[ _numpy.logical_or.accumulate( 0 == raw, axis = 1 ) ] = 0
+                column = _numpy.array( [
+                    intern_string( value ) for value in _numpy.char.decode(
+                        raw.view( "S{0}".format( size ) ).reshape( -1 ),
+                        "latin-1"
+                    ).tolist( )
+                ], dtype = object )
+            columns[ name ] = column
+
+        return columns, self.unknown_columns_from_records( records )
+
+
+    def unknown_columns_from_records( self, records ):
+        """ Returns an ordered dictionary of the unknown columns
+            of a structured array of records, keyed by offset
+            within the record. """
+
+        return _OrderedDict( [
+            ( offset, records[ column_name ] )
+            for offset, column_name in self._numpy_unknowns
+        ] )
 
 
 @_contextmanager
@@ -113,6 +381,22 @@ def database_session_scope( Session ):
         session.close( )
 
 
+def cache_directory_path( ):
+    """ Returns the path to the directory for cached data,
+        creating the directory, if necessary. """
+
+    directory_path = _os.environ.get( "DOMINIONS_TOOLS_CACHE_DIR" )
+    if not directory_path:
+        directory_path = _path_join(
+            _os.environ.get( "XDG_CACHE_HOME" )
+            or _path_expand_user( _path_join( "~", ".cache" ) ),
+            "dominions-tools"
+        )
+    _os.makedirs( directory_path, 0o700, exist_ok = True )
+
+    return directory_path
+
+
 # Dominions Platforms
 def PLATFORM_LINUX( ):     return "Linux"
 def PLATFORM_MACOSX( ):    return "MacOS X"
@@ -120,7 +404,14 @@ def PLATFORM_WINDOWS( ):   return "Windows"
 
 
 class DominionsVersion( object ):
-    """ Dominions version with comparison for ordering. """
+    """ Dominions version with comparison for ordering.
+
+        The version string is parsed once into an immutable key. Versions
+        are hashed, compared, and totally ordered by this key and then by
+        their platform, so that the same version on different platforms
+        is distinct and ordering agrees with equality. Instances are interned
+        per platform and version, so that the same version is neither
+        parsed nor stored twice. """
 
     import re               as _re
 
@@ -128,8 +419,12 @@ class DominionsVersion( object ):
     _RE_SPLIT_VERSION   = _re.compile( r"^(\d{1})\.(\d{2})(\w?)$" )
 
 
-    _platform           = None
-    _version            = None
+    __slots__           = (
+        "_platform", "_version", "_key", "_comparison_key", "__weakref__"
+    )
+
+
+    _instances          = { }
 
 
     @classmethod
@@ -137,59 +432,123 @@ class DominionsVersion( object ):
         """ Create an instance, using data gathered from the image
             of a Dominions executable, if possible. """
 
-        if   "version 4.01" == from_string( program_image, 0x255686, 12 )[ 0 ]:
-            platform, version = PLATFORM_LINUX( ), "4.01"
-        elif "version 4.03" == from_string( program_image, 0x256372, 12 )[ 0 ]:
-            platform, version = PLATFORM_LINUX( ), "4.03"
-        elif "version 4.04" == from_string( program_image, 0x2336A5, 12 )[ 0 ]:
-            platform, version = PLATFORM_LINUX( ), "4.04"
-        else:
-            raise LookupError( "Could not determine Dominions version." )
-        
-        return cls( platform, version )
+        # Note: Import here to avoid circular imports.
+        from dominions.ProgramImage import detect_dominions_version
 
+        return detect_dominions_version( program_image )
 
-    def __lt__( self, dominions_version ):
-        """ Returns True if this Dominions version is
-            less than another one. """
 
-        return 0 > self._compare_version( dominions_version )
+    @classmethod
+    def from_program_file( cls, program_path, program_image = None ):
+        """ Create an instance for a Dominions executable,
+            using an on-disk cache of previously detected versions.
+            An image of the executable, which is already in memory,
+            may be supplied to avoid mapping it again. """
 
+        # Note: Import here to avoid circular imports.
+        from dominions.ProgramImage import DominionsVersionsCache
 
-    def __gt__( self, dominions_version ):
-        """ Returns True if this Dominions version is
-            greater than another one. """
+        return DominionsVersionsCache( ).find_dominions_version(
+            program_path, program_image
+        )
+
+
+    @classmethod
+    def key_from_version( cls, version ):
+        """ Returns the key for ordering a version string,
+            without creating an instance. """
+
+        match = cls._RE_SPLIT_VERSION.match( version )
+        if None is match:
+            raise ValueError(
+                "Invalid Dominions version: {0!r}".format( version )
+            )
+        major, minor, suffix = match.groups( )
+
+        return ( int( major ), int( minor ), suffix )
+
+
+    def __new__( cls, platform, version ):
+
+        instance = cls._instances.get( ( platform, version ) )
+        if None is not instance: return instance
+
+        instance = super( DominionsVersion, cls ).__new__( cls )
+        instance._platform = platform
+        instance._version = version
+        instance._key = cls.key_from_version( version )
+        # Note: Versions without platform precede those with one.
+        instance._comparison_key = ( instance._key, platform or "" )
+
+        # Note: Concurrent creators agree on the first stored instance.
+        return cls._instances.setdefault( ( platform, version ), instance )
+
+
+    def __reduce__( self ):
+        """ Pickles by platform and version, so that unpickled instances
+            are interned as well. """
+
+        return ( DominionsVersion, ( self._platform, self._version ) )
 
-        return 0 < self._compare_version( dominions_version )
+
+    def __hash__( self ):
+        """ Returns a hash, which equal Dominions versions share. """
+
+        return hash( self._comparison_key )
 
 
     def __eq__( self, dominions_version ):
         """ Returns True if this Dominions version is
             equal to another one. """
 
-        return 0 == self._compare_version( dominions_version )
+        if not isinstance( dominions_version, DominionsVersion ):
+            return NotImplemented
+        return self._comparison_key == dominions_version._comparison_key
 
 
-    def _compare_version( self, dominions_version ):
-        """ Compares this Dominions version with another one,
-            returning -1 if the other version is greater, 
-            0 if the versions are equivalent, 
-            and 1 if this version is greater. """
+    def __ne__( self, dominions_version ):
+        """ Returns True if this Dominions version is
+            not equal to another one. """
 
-        this = self._RE_SPLIT_VERSION.findall( self._version )[ 0 ]
-        that = self._RE_SPLIT_VERSION.findall( dominions_version.version )[ 0 ]
-        result = list( filter( None, map(
-            lambda x, y: (x > y) - (x < y), this, that
-        ) ) )
+        if not isinstance( dominions_version, DominionsVersion ):
+            return NotImplemented
+        return self._comparison_key != dominions_version._comparison_key
 
-        return result[ 0 ] if result else 0
 
+    def __lt__( self, dominions_version ):
+        """ Returns True if this Dominions version is
+            less than another one. """
 
-    def __init__( self, platform, version ):
-        
-        super( DominionsVersion, self ).__init__( )
-        self._platform = platform
-        self._version = version
+        if not isinstance( dominions_version, DominionsVersion ):
+            return NotImplemented
+        return self._comparison_key < dominions_version._comparison_key
+
+
+    def __le__( self, dominions_version ):
+        """ Returns True if this Dominions version is
+            less than or equal to another one. """
+
+        if not isinstance( dominions_version, DominionsVersion ):
+            return NotImplemented
+        return self._comparison_key <= dominions_version._comparison_key
+
+
+    def __gt__( self, dominions_version ):
+        """ Returns True if this Dominions version is
+            greater than another one. """
+
+        if not isinstance( dominions_version, DominionsVersion ):
+            return NotImplemented
+        return self._comparison_key > dominions_version._comparison_key
+
+
+    def __ge__( self, dominions_version ):
+        """ Returns True if this Dominions version is
+            greater than or equal to another one. """
+
+        if not isinstance( dominions_version, DominionsVersion ):
+            return NotImplemented
+        return self._comparison_key >= dominions_version._comparison_key
 
 
     @property
@@ -206,6 +565,14 @@ class DominionsVersion( object ):
         return self._version
 
 
+    @property
+    def key( self ):
+        """ Parsed version, as a tuple of major number, minor number,
+            and suffix, for ordering versions regardless of platform. """
+
+        return self._key
+
+
 class PrettyFormatConfig( object ):
     """ Configuration for the various pretty-formatters in use. """
 